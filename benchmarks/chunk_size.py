@@ -0,0 +1,62 @@
+import argparse
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent.joinpath('src')
+
+# Chunk sizes compared with one slice at a time, including sizes beyond the
+# 63 slices a uint8 code offset could address
+CHUNK_SIZES = (2, 16, 63, 64, 100, 300)
+
+
+def get_program_parameters():
+    description = 'Guard that the streaming metrics do not depend on the chunk size.'
+    epilogue = '''
+    Counts the diff codes of random segmentations with count_codes() one
+    slice at a time and in chunks of every size in CHUNK_SIZES, and fails if
+    any chunk size gives other per-slice counts or another region of interest.
+    '''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shape', type=int, nargs=3, default=(320, 24, 24), metavar=('Z', 'Y', 'X'),
+                        help='Shape of the random segmentations')
+    args = parser.parse_args()
+    return args
+
+
+def random_case(shape, seed=0):
+    """
+    Two overlapping random masks in a box away from the volume borders.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    truth = np.zeros(shape, dtype=np.uint8)
+    computed = np.zeros(shape, dtype=np.uint8)
+    box = tuple(slice(size // 4, 3 * size // 4) for size in shape)
+    truth[box] = rng.random(truth[box].shape) < 0.5
+    computed[box] = rng.random(computed[box].shape) < 0.5
+    return truth, computed
+
+
+def main():
+    args = get_program_parameters()
+    sys.path.insert(0, str(SRC))
+    import numpy as np
+
+    from mediczna.metrics import count_codes
+
+    truth, computed = random_case(tuple(args.shape))
+    expected_counts, expected_roi = count_codes(truth, computed, 1)
+    failed = False
+    for chunk_size in CHUNK_SIZES:
+        counts, roi = count_codes(truth, computed, chunk_size)
+        ok = np.array_equal(counts, expected_counts) and roi == expected_roi
+        failed |= not ok
+        print('chunk_size {:4d}  {:s}'.format(chunk_size, 'ok' if ok else 'FAIL'))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
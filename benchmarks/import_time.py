@@ -0,0 +1,84 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent.joinpath('src')
+
+# Packages a subcommand may only import once it runs, never for --help
+BACKENDS = ('numpy', 'scipy', 'matplotlib', 'vtkmodules', 'vtk', 'SimpleITK')
+
+PROBE = '''
+import sys, time
+start = time.perf_counter()
+from mediczna.cli import main
+try:
+    main({argv!r})
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - start
+print({marker!r} + repr((elapsed, sorted({{m.split('.')[0] for m in sys.modules}} & set({backends!r})))))
+'''
+
+MARKER = 'IMPORT_TIME '
+
+
+def get_program_parameters():
+    description = 'Guard the startup time of every mediczna subcommand.'
+    epilogue = '''
+    Runs "mediczna <command> --help" in fresh interpreters and fails if it
+    takes longer than the budget or loads a plotting/rendering backend.
+    '''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per command, the median is reported')
+    parser.add_argument('--budget', type=float, default=0.1, help='Seconds allowed for the command line to start')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+    return args
+
+
+def measure(argv):
+    """
+    Time building the command line and handling argv in a fresh interpreter.
+
+    :return: The seconds spent after interpreter startup and the backends imported.
+    """
+    code = PROBE.format(argv=argv, marker=MARKER, backends=BACKENDS)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=str(SRC)), check=True)
+    line = next(line for line in result.stdout.splitlines() if line.startswith(MARKER))
+    return ast.literal_eval(line[len(MARKER):])
+
+
+def main():
+    args = get_program_parameters()
+    sys.path.insert(0, str(SRC))
+    from mediczna.cli import COMMANDS
+
+    results = {}
+    failed = False
+    for argv in [['--help']] + [[name, '--help'] for name in COMMANDS]:
+        runs = [measure(argv) for _ in range(args.repeat)]
+        seconds = statistics.median(elapsed for elapsed, _ in runs)
+        backends = runs[0][1]
+        ok = seconds <= args.budget and not backends
+        failed |= not ok
+        name = ' '.join(argv)
+        results[name] = {'seconds': seconds, 'backends': backends, 'ok': ok}
+        print('{:<20s} {:7.1f} ms  {:s}{:s}'.format(
+            name, 1000 * seconds, 'ok' if ok else 'FAIL',
+            '  imports ' + ', '.join(backends) if backends else ''))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({'budget': args.budget, 'results': results}, indent=1))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+from synthetic import SHAPE, write_case
+
+HERE = Path(__file__).resolve().parent
+SRC = HERE.parent.joinpath('src')
+
+THRESHOLDS = HERE.joinpath('thresholds.json')
+
+MARKER = 'BENCHMARK '
+
+# Slices stepped through one at a time, relative to the middle slice, and
+# random slices jumped to
+SCRUB = list(range(0, 60)) + list(range(60, -20, -1))
+JUMPS = 20
+
+# Frame rate asked of the volume rendering while rotating
+VOLUME_FPS = 10
+
+
+def get_program_parameters():
+    description = 'Benchmark loading and scrubbing the viewers on synthetic CT cases.'
+    epilogue = '''
+    Generates a synthetic case (see synthetic.py) in the data folder once,
+    then runs every benchmark in a fresh interpreter with offscreen rendering:
+    matplotlib on the Agg canvas and VTK with an offscreen render window.
+
+    Measured per viewer: time to open the case, time to the first rendered
+    frame, latency of showing the next slice while scrubbing and of jumping
+    to a random slice, its split into stages (see frame_profile.py) for
+    the matplotlib viewer, and the peak resident memory of the process
+    (memory-mapped pages that were read count as well). Fails if a value
+    exceeds its threshold in thresholds.json.
+    '''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default=HERE.joinpath('data'), help='Folder of the synthetic cases')
+    parser.add_argument('--shape', type=int, nargs=3, default=SHAPE, metavar=('Z', 'Y', 'X'),
+                        help='Shape of the synthetic volumes')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Run only these benchmarks')
+    parser.add_argument('--thresholds', default=THRESHOLDS, help='JSON file of "benchmark.metric": maximum')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    parser.add_argument('--run', choices=BENCHMARKS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    return args
+
+
+def latencies(show, indices):
+    """
+    Milliseconds spent by show(index) for every index, as summary statistics.
+    """
+    import numpy as np
+
+    elapsed = []
+    for index in indices:
+        start = time.perf_counter()
+        show(index)
+        elapsed.append(time.perf_counter() - start)
+    elapsed = 1000 * np.array(elapsed)
+    return {'mean': float(elapsed.mean()), 'p50': float(np.percentile(elapsed, 50)),
+            'p95': float(np.percentile(elapsed, 95)), 'max': float(elapsed.max())}
+
+
+def slice_sequences(size):
+    import numpy as np
+
+    middle = size // 2
+    scrub = [min(max(middle + step, 0), size - 1) for step in SCRUB]
+    jumps = np.random.default_rng(0).integers(0, size, JUMPS).tolist()
+    return scrub, jumps
+
+
+def drop_page_cache(arrays):
+    """
+    Evict the files of memory-mapped arrays from the page cache, so that their
+    slices are read from disk again. Files that are not memmaps are left alone.
+    """
+    for array in arrays:
+        file_name = getattr(array, 'filename', None)
+        if file_name is None:
+            continue
+        fd = os.open(file_name, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def view_benchmark(folder, names, pack_masks=False, cold=False, prefetch=False):
+    """
+    The matplotlib diff viewer of plt_vis.py, optionally with bit-packed segmentations.
+
+    With cold, the case is scrubbed with none of its files in the page cache.
+    With prefetch, the slices ahead are prepared on a thread pool as in plt_vis.py.
+    """
+    import matplotlib
+    matplotlib.use('agg')
+    import matplotlib.pyplot as plt
+
+    from mediczna.frame_profile import FrameProfile
+    from mediczna.plt_vis import create_diff_view, load_case
+    from mediczna.prefetch import prefetch_executor
+
+    start = time.perf_counter()
+    case = load_case(argparse.Namespace(data_folder=folder, volume_filename=names[0],
+                                        true_segmentation_filename=names[1],
+                                        computed_segmentation_filename=names[2], orientation=None,
+                                        pack_masks=pack_masks))
+    loaded = time.perf_counter()
+    if cold:
+        drop_page_cache(case)
+    fig = plt.figure(figsize=(15, 5), dpi=100)
+    profile = FrameProfile()
+    executor = prefetch_executor() if prefetch else None
+    viewer = create_diff_view(fig, *case, executor=executor, profile=profile)
+    fig.canvas.draw()
+    first_frame = time.perf_counter()
+
+    scrub, jumps = slice_sequences(len(case[0]))
+    results = {'load_s': loaded - start, 'first_frame_s': first_frame - start,
+               'scrub_ms': latencies(viewer.show, scrub), 'jump_ms': latencies(viewer.show, jumps)}
+    # Where the time of a frame goes, over all frames shown
+    results['stage_mean_ms'] = {name: values['mean'] for name, values in profile.summary()['stages_ms'].items()}
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
+    return results
+
+
+def slices_benchmark(folder, names):
+    """
+    The VTK slice viewer of vtk_slices.py.
+    """
+    from mediczna.vtk_slices import create_slice_view
+
+    start = time.perf_counter()
+    ren_win, slicers = create_slice_view(Path(folder, names[0]), Path(folder, names[1]), 0)
+    loaded = time.perf_counter()
+    ren_win.SetOffScreenRendering(True)
+    ren_win.Render()
+    first_frame = time.perf_counter()
+
+    def show(index):
+        for slicer in slicers:
+            slicer.set_slice(index)
+        ren_win.Render()
+
+    scrub, jumps = slice_sequences(len(slicers[0]))
+    results = {'load_s': loaded - start, 'first_frame_s': first_frame - start,
+               'scrub_ms': latencies(show, scrub), 'jump_ms': latencies(show, jumps)}
+    for slicer in slicers:
+        slicer.close()
+    return results
+
+
+def volume_benchmark(folder, names):
+    """
+    The CPU volume rendering of volume_render.py, at half resolution.
+    """
+    from mediczna.volume_render import create_volume_view
+
+    start = time.perf_counter()
+    ren_win, _ = create_volume_view(Path(folder, names[0]), Path(folder, names[1]), step=2)
+    loaded = time.perf_counter()
+    ren_win.SetOffScreenRendering(True)
+    ren_win.SetDesiredUpdateRate(0.0001)
+    ren_win.Render()
+    first_frame = time.perf_counter()
+
+    # Rotating at the interactive rate, then one still frame
+    camera = ren_win.GetRenderers().GetFirstRenderer().GetActiveCamera()
+    ren_win.SetDesiredUpdateRate(VOLUME_FPS)
+
+    def rotate(_):
+        camera.Azimuth(5)
+        ren_win.Render()
+
+    results = {'load_s': loaded - start, 'first_frame_s': first_frame - start,
+               'interactive_ms': latencies(rotate, range(20))}
+    ren_win.SetDesiredUpdateRate(0.0001)
+    results['still_ms'] = latencies(rotate, range(1))
+    return results
+
+
+# Name: (function, files of the case it opens)
+BENCHMARKS = {
+    'view': (view_benchmark, 'mhd'),
+    'view_chunked': (view_benchmark, 'chunked'),
+    'view_packed': (partial(view_benchmark, pack_masks=True), 'mhd'),
+    # Scrubbing from disk with and without the prefetching of plt_vis.py --prefetch
+    'view_cold': (partial(view_benchmark, cold=True), 'mhd'),
+    'view_prefetch': (partial(view_benchmark, cold=True, prefetch=True), 'mhd'),
+    'slices': (slices_benchmark, 'mhd'),
+    'volume': (volume_benchmark, 'mhd'),
+}
+
+
+def prepare(folder, shape):
+    """
+    Write the synthetic case and its converted copy if they are missing.
+
+    :return: The .mhd and .chunked file names of the volume, truth and computed segmentation.
+    """
+    from mediczna.chunked import SUFFIX
+    from mediczna.convert import convert
+
+    paths = write_case(folder, shape)
+    chunked = [path.with_suffix(SUFFIX) for path in paths]
+    for path, target in zip(paths, chunked):
+        if not target.joinpath('meta.json').is_file() or target.stat().st_mtime < path.stat().st_mtime:
+            convert(path, folder, (16, 128, 128), 3, 1)
+    return {'mhd': [path.name for path in paths], 'chunked': [path.name for path in chunked]}
+
+
+def measure(name, folder, names):
+    """
+    Run one benchmark in a fresh interpreter.
+
+    :return: Its metrics with the peak RSS of the interpreter added.
+    """
+    result = subprocess.run([sys.executable, __file__, '--run', name, '--data', str(folder)],
+                            input=json.dumps(names), capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=str(SRC)))
+    if result.returncode != 0:
+        raise RuntimeError('Benchmark {:s} failed:\n{:s}'.format(name, result.stderr))
+    line = next(line for line in result.stdout.splitlines() if line.startswith(MARKER))
+    return ast.literal_eval(line[len(MARKER):])
+
+
+def flatten(results):
+    """
+    {'view': {'scrub_ms': {'p95': 1}}} -> {'view.scrub_ms.p95': 1}
+    """
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update({key + '.' + inner: inner_value for inner, inner_value in flatten(value).items()})
+        else:
+            flat[key] = value
+    return flat
+
+
+def run_one(name, folder):
+    import resource
+
+    function, _ = BENCHMARKS[name]
+    results = function(str(folder), json.loads(sys.stdin.read()))
+    results['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(MARKER + repr(results))
+
+
+def main():
+    args = get_program_parameters()
+    folder = Path(args.data)
+    if args.run:
+        run_one(args.run, folder)
+        return
+
+    sys.path.insert(0, str(SRC))
+    names = prepare(folder, tuple(args.shape))
+    thresholds = json.loads(Path(args.thresholds).read_text()) if Path(args.thresholds).is_file() else {}
+
+    results = {}
+    failures = []
+    for name in args.only or BENCHMARKS:
+        results[name] = measure(name, folder, names[BENCHMARKS[name][1]])
+        for metric, value in flatten({name: results[name]}).items():
+            limit = thresholds.get(metric)
+            ok = limit is None or value <= limit
+            if not ok:
+                failures.append(metric)
+            print('{:<32s} {:10.2f}  {:s}'.format(
+                metric, value, '' if limit is None else '{:s} (<= {:g})'.format('ok' if ok else 'FAIL', limit)))
+
+    if args.output:
+        report = {
+            'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+            'shape': list(args.shape),
+            'results': results,
+            'thresholds': thresholds,
+            'failures': failures,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=1))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
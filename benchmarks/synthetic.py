@@ -0,0 +1,154 @@
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+# (z, y, x) shape of the volumes, a typical abdominal CT
+SHAPE = (439, 512, 512)
+
+# (z, y, x) voxel spacing in mm
+SPACING = (1.0, 0.7, 0.7)
+
+# Slices generated and written at once
+SLAB = 16
+
+# Truth labels: (centre, radii) of ellipsoids in fractions of the volume size, (z, y, x)
+ORGANS = {
+    1: ((0.55, 0.45, 0.35), (0.18, 0.20, 0.16)),
+    2: ((0.45, 0.60, 0.68), (0.08, 0.07, 0.05)),
+    3: ((0.45, 0.60, 0.32), (0.08, 0.07, 0.05)),
+}
+
+# Grey values of the phantom in HU
+AIR, TISSUE, BONE = -1000, 40, 700
+ORGAN_HU = {1: 60, 2: 30, 3: 30}
+
+
+def get_program_parameters():
+    description = 'Write a synthetic CT case as .mhd/.raw files.'
+    epilogue = '''
+    Writes volume_<case>.mhd, segmentation_<case>.mhd and computed_<case>.mhd:
+    an elliptic body with a spine and three labelled organs, and a computed
+    segmentation with the organs slightly shifted and resized. The same seed
+    and shape always give the same files.
+    '''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folder', help='The output folder')
+    parser.add_argument('--shape', type=int, nargs=3, default=SHAPE, metavar=('Z', 'Y', 'X'))
+    parser.add_argument('--case', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    return args
+
+
+def write_header(path, shape, spacing, element_type, data_file):
+    """
+    Write a .mhd header for a (z, y, x) volume stored in data_file.
+    """
+    lines = [
+        'ObjectType = Image',
+        'NDims = 3',
+        'BinaryData = True',
+        'BinaryDataByteOrderMSB = False',
+        'CompressedData = False',
+        'TransformMatrix = 1 0 0 0 1 0 0 0 1',
+        'Offset = 0 0 0',
+        'ElementSpacing = {:s}'.format(' '.join('{:g}'.format(value) for value in spacing[::-1])),
+        'DimSize = {:s}'.format(' '.join(str(size) for size in shape[::-1])),
+        'ElementType = {:s}'.format(element_type),
+        'ElementDataFile = {:s}'.format(data_file),
+    ]
+    Path(path).write_text('\n'.join(lines) + '\n')
+
+
+def ellipsoid_slab(z, grid, centre, radii):
+    """
+    Mask of an ellipsoid on the slices z, all coordinates in voxels.
+    """
+    distance = ((z[:, None, None] - centre[0]) / radii[0]) ** 2
+    distance = distance + ((grid[0] - centre[1]) / radii[1]) ** 2 + ((grid[1] - centre[2]) / radii[2]) ** 2
+    return distance <= 1
+
+
+def organs(shape, rng=None):
+    """
+    The organ ellipsoids in voxels, jittered for the computed segmentation if rng is given.
+    """
+    result = {}
+    for label, (centre, radii) in ORGANS.items():
+        centre = np.multiply(centre, shape)
+        radii = np.multiply(radii, shape)
+        if rng is not None:
+            centre = centre + rng.normal(0, 0.1, 3) * radii
+            radii = radii * rng.uniform(0.9, 1.1, 3)
+        result[label] = centre, radii
+    return result
+
+
+def write_case(folder, shape=SHAPE, case=1, seed=0):
+    """
+    Write the volume, truth and computed segmentation of a synthetic case.
+
+    Files written earlier with the same parameters are kept, see synthetic.json.
+
+    :return: The paths of the volume, truth and computed .mhd files.
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    names = ['{:s}_{:d}'.format(name, case) for name in ('volume', 'segmentation', 'computed')]
+    paths = [folder.joinpath(name + '.mhd') for name in names]
+
+    parameters = {'shape': list(shape), 'spacing': list(SPACING), 'seed': seed}
+    record = folder.joinpath('synthetic.json')
+    written = json.loads(record.read_text()) if record.is_file() else {}
+    if written.get(str(case)) == parameters and all(path.is_file() for path in paths):
+        return paths
+
+    rng = np.random.default_rng(seed)
+    truth_organs = organs(shape)
+    computed_organs = organs(shape, rng)
+    grid = np.mgrid[0:shape[1], 0:shape[2]].astype(np.float32)
+    body = ((grid[0] - 0.5 * shape[1]) / (0.36 * shape[1])) ** 2 + \
+           ((grid[1] - 0.5 * shape[2]) / (0.45 * shape[2])) ** 2 <= 1
+    spine = (grid[0] - 0.72 * shape[1]) ** 2 + (grid[1] - 0.5 * shape[2]) ** 2 <= (0.05 * shape[2]) ** 2
+
+    files = [open(folder.joinpath(name + '.raw'), 'wb') for name in names]
+    try:
+        for start in range(0, shape[0], SLAB):
+            z = np.arange(start, min(start + SLAB, shape[0]), dtype=np.float32)
+            volume = np.where(body, np.int16(TISSUE), np.int16(AIR)).astype(np.int16)
+            volume = np.repeat(volume[None], len(z), axis=0)
+            volume[:, spine] = BONE
+            truth = np.zeros(volume.shape, dtype=np.uint8)
+            computed = np.zeros(volume.shape, dtype=np.uint8)
+            for label in ORGANS:
+                mask = ellipsoid_slab(z, grid, *truth_organs[label])
+                truth[mask] = label
+                volume[mask] = ORGAN_HU[label]
+                computed[ellipsoid_slab(z, grid, *computed_organs[label])] = label
+            volume += rng.normal(0, 20, volume.shape).astype(np.int16)
+
+            for f, data in zip(files, (volume, truth, computed)):
+                f.write(data.tobytes())
+    finally:
+        for f in files:
+            f.close()
+
+    write_header(paths[0], shape, SPACING, 'MET_SHORT', names[0] + '.raw')
+    for path, name in zip(paths[1:], names[1:]):
+        write_header(path, shape, SPACING, 'MET_UCHAR', name + '.raw')
+    written[str(case)] = parameters
+    record.write_text(json.dumps(written, indent=1))
+    return paths
+
+
+def main():
+    args = get_program_parameters()
+    for path in write_case(args.folder, tuple(args.shape), args.case, args.seed):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
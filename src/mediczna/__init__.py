@@ -0,0 +1,8 @@
+"""
+Visualization and evaluation of CT volume segmentations.
+
+Run ``mediczna --help`` for the available commands. Importing the package
+does not import any of the plotting or rendering backends.
+"""
+
+__version__ = '0.1.0'
@@ -0,0 +1,3 @@
+from mediczna.cli import main
+
+main()
@@ -0,0 +1,164 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+
+def get_program_parameters(argv=None):
+    description = 'Score computed segmentations against the ground truth of every case in a data folder.'
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError('must be at least 1, got {:d}'.format(value))
+    return value
+
+
+def add_arguments(parser):
+    parser.add_argument('data_folder', help='The path to volume_*.mhd and segmentation_*.mhd files')
+    parser.add_argument('computed_folder', help='The path to computed segmentation_*.mhd files')
+    parser.add_argument('output', help='Results file, .csv or .json (one JSON object per line)')
+    parser.add_argument('--workers', type=positive_int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--chunk-size', type=positive_int, default=16, help='Slices read at once by a worker')
+    parser.add_argument('--confusion', metavar='JSON',
+                        help='Also write the label confusion matrix and per-label metrics of every case to this '
+                             'file, as JSON lines whatever its suffix')
+
+
+def find_cases(data_folder, computed_folder):
+    """
+    Pair the cases of a data folder with their computed segmentations.
+
+    :param data_folder: Folder with volume_<id>.mhd and segmentation_<id>.mhd files.
+    :param computed_folder: Folder with the computed segmentation_<id>.mhd files.
+    :return: A sorted list of (case id, truth path, computed path) tuples.
+    """
+    data_folder, computed_folder = Path(data_folder), Path(computed_folder)
+    cases = []
+    for volume_path in data_folder.glob('volume_*.mhd'):
+        case_id = volume_path.stem[len('volume_'):]
+        truth_path = data_folder.joinpath('segmentation_{:s}.mhd'.format(case_id))
+        computed_path = computed_folder.joinpath(truth_path.name)
+        if not truth_path.is_file():
+            print('Skipping {:s}: {:s} does not exist'.format(case_id, str(truth_path)), file=sys.stderr)
+        elif not computed_path.is_file():
+            print('Skipping {:s}: {:s} does not exist'.format(case_id, str(computed_path)), file=sys.stderr)
+        else:
+            cases.append((case_id, truth_path, computed_path))
+    return sorted(cases)
+
+
+def evaluate_case(case_id, truth_path, computed_path, chunk_size, confusion=False):
+    """
+    Score one case, with its label confusion matrix under 'labels' if confusion is set.
+    """
+    from mediczna.metrics import confusion_matrix, evaluate, label_counts, overlap_metrics
+    from mediczna.mhd import load, spacing
+
+    start = time.perf_counter()
+    truth, header = load(truth_path)
+    computed, _ = load(computed_path)
+    if truth.shape != computed.shape:
+        raise ValueError('Shape mismatch: {} vs {}'.format(truth.shape, computed.shape))
+
+    volume_metrics, _ = evaluate(truth, computed, spacing(header), chunk_size)
+    row = dict(case=case_id, slices=len(truth), **volume_metrics)
+    if confusion:
+        matrix = confusion_matrix(truth, computed, chunk_size=chunk_size, names=(truth_path, computed_path))
+        row['labels'] = dict(confusion=matrix.tolist(),
+                             **{name: values.tolist() for name, values in overlap_metrics(label_counts(matrix)).items()})
+    row['seconds'] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def json_safe(value):
+    """
+    NaN is not valid JSON, replace it by None in nested dicts and lists.
+    """
+    if isinstance(value, dict):
+        return {key: json_safe(inner) for key, inner in value.items()}
+    if isinstance(value, list):
+        return [json_safe(inner) for inner in value]
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+class ResultWriter:
+    """
+    Appends per-case results to a CSV or JSON lines file as they arrive.
+
+    Files ending in .csv get CSV rows of the volume metrics unless
+    json_lines is set, e.g. for the nested confusion matrices.
+    """
+
+    def __init__(self, path, json_lines=False):
+        from mediczna.metrics import OVERLAP_METRICS, SURFACE_METRICS
+
+        self.file = open(path, 'w', newline='')
+        if Path(path).suffix == '.csv' and not json_lines:
+            fields = ('case',) + OVERLAP_METRICS + SURFACE_METRICS + ('slices', 'seconds')
+            self.csv = csv.DictWriter(self.file, fieldnames=fields)
+            self.csv.writeheader()
+        else:
+            self.csv = None
+
+    def write(self, row):
+        if self.csv:
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(json_safe(row)) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def run(args):
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    cases = find_cases(args.data_folder, args.computed_folder)
+    if not cases:
+        print('No cases found in {:s}'.format(args.data_folder))
+        return
+
+    writer = ResultWriter(args.output)
+    confusion = ResultWriter(args.confusion, json_lines=True) if args.confusion else None
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(evaluate_case, *case, args.chunk_size, confusion is not None): case[0]
+                   for case in cases}
+        for done, future in enumerate(as_completed(futures), 1):
+            case_id = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                failed += 1
+                print('[{:d}/{:d}] {:s} failed: {}'.format(done, len(cases), case_id, e), file=sys.stderr)
+                continue
+            labels = row.pop('labels', None)
+            writer.write(row)
+            if confusion:
+                confusion.write(dict(case=case_id, **labels))
+            print('[{:d}/{:d}] {:s} dice={:.4f}'.format(done, len(cases), case_id, row['dice']))
+    writer.close()
+    if confusion:
+        confusion.close()
+
+    if failed:
+        sys.exit(1)
+
+
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
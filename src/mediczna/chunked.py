@@ -0,0 +1,361 @@
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from mediczna.mhd import load
+
+# Suffix of the directories written by convert.py
+SUFFIX = '.chunked'
+
+FORMAT_VERSION = 1
+
+
+def preview(source, index):
+    """
+    A coarse version of slice index of any slice source.
+
+    :return: The preview, or None if the source has none or can give the full
+             resolution slice from memory.
+    """
+    source_preview = getattr(source, 'preview', None)
+    return None if source_preview is None else source_preview(index)
+
+
+def open_volume(path):
+    """
+    Open a .mhd/.raw pair or a converted .chunked directory.
+
+    :param path: Path to a .mhd file or a .chunked directory.
+    :return: An array-like indexed (z, y, x) and the header dict.
+    """
+    path = Path(path)
+    if path.suffix == SUFFIX or path.is_dir():
+        volume = ChunkedVolume(path)
+        return volume, volume.header
+    return load(path)
+
+
+def crop_view(volume, key):
+    """
+    Crop a volume without reading it: a view of a memmap, a ChunkedVolume or
+    anything else with a region() method.
+    """
+    if hasattr(volume, 'region'):
+        return volume.region(key)
+    return volume[key]
+
+
+def write_chunked(volume, header, path, chunk_shape=(16, 128, 128), levels=3, compression=1):
+    """
+    Write a volume as zlib compressed chunks with a downsampled pyramid.
+
+    Level n keeps every 2**n-th voxel along each axis, so labels stay labels.
+    Every level is stored as one file of concatenated chunks and an index of
+    their byte offsets. The source is read one row of chunks at a time.
+
+    :param volume: Array indexed (z, y, x), e.g. a memmap returned by mhd.load.
+    :param header: The MetaImage header of the volume.
+    :param path: The output directory.
+    :param chunk_shape: The (z, y, x) shape of a chunk.
+    :param levels: Number of resolution levels, full resolution included.
+    :param compression: zlib compression level.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    level_meta = []
+    for level in range(levels):
+        factor = 2 ** level
+        source = volume[::factor, ::factor, ::factor]
+        grid = [-(-size // chunk) for size, chunk in zip(source.shape, chunk_shape)]
+        offsets = np.zeros(int(np.prod(grid)) + 1, dtype=np.int64)
+
+        with open(path.joinpath('level_{:d}.bin'.format(level)), 'wb') as f:
+            number = 0
+            for z in range(grid[0]):
+                # One slab of slices, contiguous so the chunks compress quickly
+                slab = np.ascontiguousarray(source[z * chunk_shape[0]:(z + 1) * chunk_shape[0]])
+                for y in range(grid[1]):
+                    for x in range(grid[2]):
+                        chunk = slab[:, y * chunk_shape[1]:(y + 1) * chunk_shape[1],
+                                     x * chunk_shape[2]:(x + 1) * chunk_shape[2]]
+                        f.write(zlib.compress(np.ascontiguousarray(chunk).tobytes(), compression))
+                        number += 1
+                        offsets[number] = f.tell()
+
+        np.save(path.joinpath('level_{:d}.index.npy'.format(level)), offsets)
+        level_meta.append({'factor': factor, 'shape': list(source.shape), 'grid': grid})
+
+    fields = {key: list(value) if isinstance(value, tuple) else value
+              for key, value in header.items() if not key.startswith('_') and key != 'ElementDataFile'}
+    meta = {
+        'version': FORMAT_VERSION,
+        'shape': list(volume.shape),
+        'dtype': volume.dtype.str,
+        'chunk_shape': list(chunk_shape),
+        'levels': level_meta,
+        'header': fields,
+    }
+    # Written last, a directory without it is an interrupted conversion
+    path.joinpath('meta.json').write_text(json.dumps(meta, indent=1))
+
+
+class ChunkCache:
+    """
+    An LRU cache of the chunks of a volume split into a regular grid.
+
+    Subclasses provide level_shape() and load(), which gives the contents of
+    one chunk. Chunks are loaded outside of the lock, so several threads can
+    read at once.
+    """
+
+    def __init__(self, dtype, chunk_shape, cache_bytes):
+        self.dtype = np.dtype(dtype)
+        self.chunk_shape = tuple(chunk_shape)
+        self.cache_bytes = cache_bytes
+        self.nbytes = 0
+        self._chunks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def level_shape(self, level):
+        raise NotImplementedError
+
+    def load(self, level, key):
+        raise NotImplementedError
+
+    def cached(self, level, key):
+        return (level, key) in self._chunks
+
+    def chunk(self, level, key):
+        """
+        The chunk at grid position key = (z, y, x) of a level.
+        """
+        with self._lock:
+            try:
+                self._chunks.move_to_end((level, key))
+                return self._chunks[(level, key)]
+            except KeyError:
+                pass
+
+        chunk = self.load(level, key)
+
+        with self._lock:
+            if (level, key) not in self._chunks:
+                self._chunks[(level, key)] = chunk
+                self.nbytes += chunk.nbytes
+            while self.nbytes > self.cache_bytes and len(self._chunks) > 1:
+                _, evicted = self._chunks.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return chunk
+
+    def chunk_box(self, level, key):
+        """
+        The (start, stop) pair per axis covered by a chunk.
+        """
+        return [(k * chunk, min((k + 1) * chunk, size))
+                for k, chunk, size in zip(key, self.chunk_shape, self.level_shape(level))]
+
+    def chunk_keys(self, box):
+        """
+        Grid positions of the chunks intersecting box, a (start, stop) pair per axis.
+        """
+        ranges = [range(start // chunk, -(-stop // chunk)) for (start, stop), chunk in zip(box, self.chunk_shape)]
+        return [(z, y, x) for z in ranges[0] for y in ranges[1] for x in ranges[2]]
+
+    def read(self, level, box):
+        """
+        Assemble the voxels inside box from the chunks of a level.
+        """
+        out = np.empty([stop - start for start, stop in box], dtype=self.dtype)
+        for key in self.chunk_keys(box):
+            chunk = self.chunk(level, key)
+            chunk_box = self.chunk_box(level, key)
+            src = tuple(slice(max(start, c_start) - c_start, min(stop, c_stop) - c_start)
+                        for (start, stop), (c_start, c_stop) in zip(box, chunk_box))
+            dst = tuple(slice(max(start, c_start) - start, min(stop, c_stop) - start)
+                        for (start, stop), (c_start, c_stop) in zip(box, chunk_box))
+            out[dst] = chunk[src]
+        return out
+
+
+class ChunkStore(ChunkCache):
+    """
+    The chunk files of a converted volume with an LRU cache of decompressed chunks.
+    """
+
+    def __init__(self, path, cache_bytes=128 * 2 ** 20):
+        self.path = Path(path)
+        meta_path = self.path.joinpath('meta.json')
+        if not meta_path.is_file():
+            raise ValueError('Not a converted volume: {:s}'.format(str(self.path)))
+        self.meta = json.loads(meta_path.read_text())
+        if self.meta['version'] != FORMAT_VERSION:
+            raise ValueError('Unsupported chunked format version {:d} in {:s}'.format(
+                self.meta['version'], str(self.path)))
+        super().__init__(self.meta['dtype'], self.meta['chunk_shape'], cache_bytes)
+        self._files = {}
+
+    def level_shape(self, level):
+        return tuple(self.meta['levels'][level]['shape'])
+
+    def _file(self, level):
+        with self._lock:
+            if level not in self._files:
+                data = np.memmap(self.path.joinpath('level_{:d}.bin'.format(level)), dtype=np.uint8, mode='r')
+                offsets = np.load(self.path.joinpath('level_{:d}.index.npy'.format(level)))
+                self._files[level] = data, offsets
+            return self._files[level]
+
+    def load(self, level, key):
+        data, offsets = self._file(level)
+        grid = self.meta['levels'][level]['grid']
+        number = (key[0] * grid[1] + key[1]) * grid[2] + key[2]
+        shape = [stop - start for start, stop in self.chunk_box(level, key)]
+        return np.frombuffer(zlib.decompress(data[offsets[number]:offsets[number + 1]]),
+                             dtype=self.dtype).reshape(shape)
+
+
+class SlabCache(ChunkCache):
+    """
+    Slabs of a volume perpendicular to one axis, copied so that their planes
+    along that axis are contiguous.
+
+    Planes across the slices of a memmap or a ChunkedVolume are strided or
+    span many chunks. The slabs keep the axis order of the volume, only their
+    memory layout differs, so a plane of a cached slab is a contiguous view and
+    read() works as for any other ChunkCache.
+    """
+
+    def __init__(self, volume, axis, thickness=32, cache_bytes=256 * 2 ** 20):
+        chunk_shape = list(volume.shape[:3])
+        chunk_shape[axis] = thickness
+        super().__init__(volume.dtype, chunk_shape, cache_bytes)
+        self.volume = volume
+        self.axis = axis
+
+    def level_shape(self, level):
+        return self.volume.shape[:3]
+
+    def load(self, level, key):
+        slab = np.asarray(self.volume[tuple(slice(start, stop) for start, stop in self.chunk_box(level, key))])
+        return np.moveaxis(np.ascontiguousarray(np.moveaxis(slab, self.axis, 0)), 0, self.axis)
+
+    def plane(self, index):
+        """
+        The plane at index along the axis, a view of the cached slab.
+        """
+        thickness = self.chunk_shape[self.axis]
+        key = [0, 0, 0]
+        key[self.axis] = index // thickness
+        slab = self.chunk(0, tuple(key))
+        return slab[(slice(None),) * self.axis + (index % thickness,)]
+
+
+class ChunkedVolume:
+    """
+    A converted volume that reads and decompresses only the chunks it is indexed with.
+
+    Indexing returns numpy arrays like a memmap does, region() returns a
+    cropped view without reading anything. preview() serves slices of the
+    coarsest level, which is read in full the first time it is needed.
+    """
+
+    def __init__(self, path, level=0, store=None, box=None):
+        self.store = ChunkStore(path) if store is None else store
+        self.level = level
+        self.box = [(0, size) for size in self.store.level_shape(level)] if box is None else box
+        self.shape = tuple(stop - start for start, stop in self.box)
+        self.dtype = self.store.dtype
+        self.ndim = 3
+        self._coarse = None
+
+    @property
+    def header(self):
+        fields = dict(self.store.meta['header'])
+        for key in ('DimSize', 'ElementSpacing', 'Offset'):
+            if key in fields:
+                fields[key] = tuple(fields[key])
+        return fields
+
+    @property
+    def levels(self):
+        return len(self.store.meta['levels'])
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.store.read(self.level, self.box)
+        return data if dtype is None else data.astype(dtype)
+
+    def _normalize(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > self.ndim:
+            raise IndexError('too many indices for a {:d}-dimensional volume'.format(self.ndim))
+        return key + (slice(None),) * (self.ndim - len(key))
+
+    def __getitem__(self, key):
+        box, post = [], []
+        for item, (start, stop), size in zip(self._normalize(key), self.box, self.shape):
+            if isinstance(item, slice):
+                first, last, step = item.indices(size)
+                if step < 0:
+                    # Read only the span of the selection, reversed afterwards
+                    count = len(range(first, last, step))
+                    lowest = first + (count - 1) * step if count else first
+                    box.append((start + lowest, start + (first + 1 if count else lowest)))
+                    post.append(slice(None, None, step))
+                else:
+                    box.append((start + first, start + max(last, first)))
+                    post.append(slice(None, None, step))
+            else:
+                index = int(item)
+                if not -size <= index < size:
+                    raise IndexError('index {:d} is out of bounds for axis with size {:d}'.format(index, size))
+                index %= size
+                box.append((start + index, start + index + 1))
+                post.append(0)
+        return self.store.read(self.level, box)[tuple(post)]
+
+    def region(self, key):
+        """
+        A cropped view, key holds one step 1 slice per axis.
+        """
+        box = []
+        for item, (start, stop), size in zip(self._normalize(key), self.box, self.shape):
+            first, last, step = item.indices(size)
+            if step != 1:
+                raise ValueError('Only contiguous regions of a chunked volume can be viewed')
+            box.append((start + first, start + max(last, first)))
+        return ChunkedVolume(self.store.path, self.level, self.store, box)
+
+    def coarsest(self):
+        """
+        The whole coarsest level as an array and its downsampling factor.
+        """
+        if self._coarse is None:
+            level = self.levels - 1
+            self._coarse = self.store.read(level, [(0, size) for size in self.store.level_shape(level)])
+        return self._coarse, self.store.meta['levels'][-1]['factor'] // self.store.meta['levels'][self.level]['factor']
+
+    def preview(self, index):
+        """
+        Slice index upsampled from the coarsest level, None if the full
+        resolution slice is already in the chunk cache.
+        """
+        z = self.box[0][0] + index
+        box = [(z, z + 1)] + self.box[1:]
+        if all(self.store.cached(self.level, key) for key in self.store.chunk_keys(box)):
+            return None
+
+        coarse, factor = self.coarsest()
+        (y0, y1), (x0, x1) = self.box[1:]
+        plane = coarse[min(z // factor, len(coarse) - 1),
+                       y0 // factor:-(-y1 // factor), x0 // factor:-(-x1 // factor)]
+        plane = plane.repeat(factor, axis=0).repeat(factor, axis=1)
+        return plane[y0 % factor:y0 % factor + y1 - y0, x0 % factor:x0 % factor + x1 - x0]
@@ -0,0 +1,42 @@
+import argparse
+import importlib
+
+from mediczna import __version__
+
+# Subcommand name: (module, help). Every module provides add_arguments(parser)
+# and run(args), and imports its backend (matplotlib, VTK, scipy) in run, so
+# building the parser or printing --help never loads one.
+COMMANDS = {
+    'view': ('mediczna.plt_vis', 'Truth source, diff and computed slices side by side (matplotlib)'),
+    'mpr': ('mediczna.mpr', 'Linked axial, coronal and sagittal planes with crosshairs (matplotlib)'),
+    'export': ('mediczna.export', 'Render the diff view of every slice to PNG frames or a contact sheet'),
+    'serve': ('mediczna.serve', 'Serve the diff view of a case as image tiles to browsers'),
+    'slices': ('mediczna.vtk_slices', 'Volume and segmentation slices (VTK)'),
+    'surface': ('mediczna.surface', 'Skin isosurface and label surfaces in 3D (VTK)'),
+    'volume': ('mediczna.volume_render', 'CPU ray-cast volume rendering with the labels blended in (VTK)'),
+    'distance': ('mediczna.surface_distance', 'Computed surface coloured by its distance to the truth (VTK)'),
+    'eval': ('mediczna.batch_eval', 'Score the computed segmentations of a data folder'),
+    'convert': ('mediczna.convert', 'Convert .mhd/.raw volumes to compressed chunks'),
+}
+
+
+def get_program_parameters(argv=None):
+    parser = argparse.ArgumentParser(prog='mediczna', description='Visualize and evaluate CT segmentations.',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--version', action='version', version='%(prog)s ' + __version__)
+    subparsers = parser.add_subparsers(dest='command', metavar='command', required=True)
+    for name, (module_name, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text, description=help_text,
+                                          formatter_class=argparse.RawDescriptionHelpFormatter)
+        importlib.import_module(module_name).add_arguments(subparser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def main(argv=None):
+    args = get_program_parameters(argv)
+    importlib.import_module(COMMANDS[args.command][0]).run(args)
+
+
+if __name__ == '__main__':
+    main()
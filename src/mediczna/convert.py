@@ -0,0 +1,65 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+from mediczna.batch_eval import positive_int
+
+
+def get_program_parameters(argv=None):
+    description = 'Convert .mhd/.raw volumes to compressed chunks with a downsampled pyramid.'
+    epilogue = '''
+    Every input file becomes a <name>.chunked directory in the output folder.
+    The viewers open these directories in place of the .mhd files, show a
+    preview from the coarsest level at once and read only the full resolution
+    chunks of the slices displayed.
+    '''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def add_arguments(parser):
+    parser.add_argument('files', nargs='+', help='The .mhd files to convert')
+    parser.add_argument('--output', help='Output folder, next to each input file by default')
+    parser.add_argument('--chunk-shape', type=int, nargs=3, default=(16, 128, 128), metavar=('Z', 'Y', 'X'),
+                        help='Shape of a chunk in voxels')
+    parser.add_argument('--levels', type=int, default=3, help='Number of resolution levels, full resolution included')
+    parser.add_argument('--compression', type=int, default=1, choices=range(10), metavar='0-9',
+                        help='zlib compression level')
+    parser.add_argument('--workers', type=positive_int, default=os.cpu_count(), help='Number of worker processes')
+
+
+def convert(path, output, chunk_shape, levels, compression):
+    from mediczna.chunked import SUFFIX, write_chunked
+    from mediczna.mhd import load
+
+    start = time.perf_counter()
+    volume, header = load(path)
+    target = Path(output).joinpath(Path(path).stem + SUFFIX)
+    write_chunked(volume, header, target, chunk_shape, levels, compression)
+    size = sum(f.stat().st_size for f in target.iterdir())
+    return target, volume.nbytes, size, time.perf_counter() - start
+
+
+def run(args):
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(args.files))) as executor:
+        futures = [executor.submit(convert, path, args.output or Path(path).parent,
+                                   tuple(args.chunk_shape), args.levels, args.compression)
+                   for path in args.files]
+        for future in futures:
+            target, raw_size, size, elapsed = future.result()
+            print('{:s}: {:.1f} MiB -> {:.1f} MiB in {:.1f}s'.format(
+                str(target), raw_size / 2 ** 20, size / 2 ** 20, elapsed))
+
+
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
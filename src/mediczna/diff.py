@@ -0,0 +1,96 @@
+import numpy as np
+
+from mediczna.chunked import preview
+from mediczna.frame_profile import stage
+
+# Diff codes stored in a single uint8 volume
+BACKGROUND = 0
+TRUE_POSITIVE = 1
+FALSE_NEGATIVE = 2
+FALSE_POSITIVE = 3
+# Labelled in both but with different labels, see confusion_codes()
+MISLABELED = 4
+
+# Maps (truth > 0) + 2 * (computed > 0) to the diff code
+_MASKS_TO_CODE = np.array([BACKGROUND, FALSE_NEGATIVE, FALSE_POSITIVE, TRUE_POSITIVE], dtype=np.uint8)
+
+
+def diff_codes(truth, computed):
+    """
+    Label every voxel of a truth/computed pair of slices (or slice chunks).
+
+    :param truth: The ground truth segmentation.
+    :param computed: The computed segmentation, same shape as truth.
+    :return: A uint8 array of diff codes.
+    """
+    with stage('overlay'):
+        masks = (truth > 0).view(np.uint8)
+        masks += 2 * (computed > 0).view(np.uint8)
+        return _MASKS_TO_CODE[masks]
+
+
+def confusion_codes(truth, computed):
+    """
+    Label every voxel by its confusion class between two label maps.
+
+    Like diff_codes(), except that voxels labelled in both segmentations
+    but with different labels are MISLABELED instead of TRUE_POSITIVE.
+
+    :param truth: The ground truth label map.
+    :param computed: The computed label map, same shape as truth.
+    :return: A uint8 array of diff codes.
+    """
+    codes = diff_codes(truth, computed)
+    with stage('overlay'):
+        codes[(codes == TRUE_POSITIVE) & (truth != computed)] = MISLABELED
+        return codes
+
+
+def diff_volume(truth, computed, chunk_size=16, codes=diff_codes):
+    """
+    Compute the diff codes of whole volumes chunk by chunk.
+
+    Only chunk_size slices of temporaries exist at any time, so memory-mapped
+    segmentations are never materialized in full.
+
+    :param truth: The ground truth segmentation, indexed by slice.
+    :param computed: The computed segmentation, same shape as truth.
+    :param chunk_size: How many slices to process at once.
+    :param codes: diff_codes, or confusion_codes to tell mislabeled voxels apart.
+    :return: A uint8 volume of diff codes.
+    """
+    volume = np.empty(truth.shape, dtype=np.uint8)
+    for start in range(0, len(truth), chunk_size):
+        stop = start + chunk_size
+        volume[start:stop] = codes(truth[start:stop], computed[start:stop])
+    return volume
+
+
+class LazyDiff:
+    """
+    Diff codes of a truth/computed pair evaluated for one slice at a time.
+
+    codes computes them, diff_codes or confusion_codes.
+    """
+
+    def __init__(self, truth, computed, codes=diff_codes):
+        self.truth = truth
+        self.computed = computed
+        self.codes = codes
+        self.shape = truth.shape
+
+    def __len__(self):
+        return len(self.truth)
+
+    def __getitem__(self, index):
+        return self.codes(self.truth[index], self.computed[index])
+
+    def preview(self, index):
+        """
+        Diff codes of the previews of slice index, None if neither segmentation has one.
+        """
+        truth, computed = preview(self.truth, index), preview(self.computed, index)
+        if truth is None and computed is None:
+            return None
+        return self.codes(self.truth[index] if truth is None else truth,
+                          self.computed[index] if computed is None else computed)
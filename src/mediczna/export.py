@@ -0,0 +1,120 @@
+import argparse
+import math
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from mediczna.batch_eval import positive_int
+from mediczna.plt_vis import add_case_arguments, create_diff_view, load_case
+
+
+def get_program_parameters(argv=None):
+    description = 'Render the truth source, diff and computed panels of every slice without a window.'
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def add_arguments(parser):
+    add_case_arguments(parser)
+    parser.add_argument('output', help='Directory for numbered PNG frames, or a .png contact sheet with --sheet')
+    parser.add_argument('--start', type=int, default=0, help='First slice to render')
+    parser.add_argument('--stop', type=int, help='Slice to stop before, the last slice by default')
+    parser.add_argument('--sheet', action='store_true', help='Tile all frames into a single contact sheet')
+    parser.add_argument('--columns', type=int, default=6, help='Frames per row of the contact sheet')
+    parser.add_argument('--size', type=int, nargs=2, default=(960, 360), metavar=('WIDTH', 'HEIGHT'),
+                        help='Size of one frame in pixels')
+    parser.add_argument('--workers', type=positive_int, default=os.cpu_count(), help='Number of worker processes')
+
+
+def split_range(start, stop, parts):
+    """
+    Split [start, stop) into at most parts contiguous ranges of similar length.
+    """
+    step = math.ceil((stop - start) / parts)
+    return [range(first, min(first + step, stop)) for first in range(start, stop, step)]
+
+
+def render_frames(args, indices, sheet_path=None, sheet_start=0):
+    """
+    Render the given slices on one reused Agg figure.
+
+    Frames are written as numbered PNGs to args.output, or into the tiles of
+    the contact sheet memory-mapped at sheet_path.
+    """
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.image import imsave
+
+    width, height = args.size
+    fig = Figure(figsize=(width / 100, height / 100), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    case = load_case(args)
+    viewer = create_diff_view(fig, *case, confusion=args.confusion)
+    label = fig.text(0.01, 0.01, '', animated=True)
+    viewer.add_animated(label)
+    canvas.draw()
+
+    sheet = np.lib.format.open_memmap(sheet_path, mode='r+') if sheet_path else None
+    digits = len(str(len(case[0]) - 1))
+    for index in indices:
+        label.set_text('Slice {:d}'.format(index))
+        viewer.show(index)
+        frame = np.asarray(canvas.buffer_rgba())
+        if sheet is None:
+            imsave(Path(args.output).joinpath('frame_{:0{}d}.png'.format(index, digits)), frame)
+        else:
+            row, column = divmod(index - sheet_start, args.columns)
+            sheet[row * height:(row + 1) * height, column * width:(column + 1) * width] = frame
+    if sheet is not None:
+        sheet.flush()
+    return len(indices)
+
+
+def run(args):
+    from concurrent.futures import ProcessPoolExecutor
+
+    import numpy as np
+    from matplotlib.image import imsave
+
+    volume_img, _, _ = load_case(args)
+    stop = len(volume_img) if args.stop is None else min(args.stop, len(volume_img))
+    start = max(args.start, 0)
+    if start >= stop:
+        print('Nothing to render for slices [{:d}, {:d})'.format(start, stop))
+        return
+
+    ranges = split_range(start, stop, args.workers)
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        sheet_path = None
+        if args.sheet:
+            # Workers write their tiles straight into a shared memory-mapped sheet
+            width, height = args.size
+            rows = math.ceil((stop - start) / args.columns)
+            sheet_path = os.path.join(tmp, 'sheet.npy')
+            np.lib.format.open_memmap(sheet_path, mode='w+', dtype=np.uint8,
+                                      shape=(rows * height, args.columns * width, 4))
+        else:
+            Path(args.output).mkdir(parents=True, exist_ok=True)
+
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(render_frames, args, indices, sheet_path, start) for indices in ranges]
+            frames = sum(future.result() for future in futures)
+
+        if args.sheet:
+            imsave(args.output, np.load(sheet_path, mmap_mode='r'))
+
+    elapsed = time.perf_counter() - started
+    print('Rendered {:d} frames in {:.1f}s ({:.1f} frames/s)'.format(frames, elapsed, frames / elapsed))
+
+
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
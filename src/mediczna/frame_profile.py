@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+# Stages of a frame: reading slices, computing the diff/mask overlay, mapping
+# values to colours and drawing or rendering (matplotlib maps the colours of
+# plain image layers while drawing them)
+STAGES = ('fetch', 'overlay', 'colormap', 'draw')
+
+# Upper bin edges of the latency histograms in ms, the last bin is open
+HISTOGRAM_EDGES_MS = (1, 2, 4, 8, 16, 33, 66, 100, 250, 500, 1000)
+
+# Frames kept for the rolling statistics
+WINDOW = 500
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a stage of the frame being profiled on this thread.
+
+    Stages may nest, every stage is charged its own time only, without the
+    time of the stages inside it. Outside of FrameProfile.frame(), e.g. on
+    prefetch threads, this does nothing.
+    """
+    frame = getattr(_local, 'frame', None)
+    if frame is None:
+        yield
+        return
+    start = time.perf_counter()
+    frame['stack'].append(0.0)
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        inner = frame['stack'].pop()
+        frame['stages'][name] = frame['stages'].get(name, 0.0) + elapsed - inner
+        if frame['stack']:
+            frame['stack'][-1] += elapsed
+
+
+class FrameProfile:
+    """
+    Rolling per-stage latencies of the frames of a viewer.
+
+    Wrap the work of a frame in frame() and its parts in stage(). The last
+    WINDOW frames are kept for the statistics, dump() writes them as JSON.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.count = 0
+        self.frames = deque(maxlen=window)
+        self.ends = deque(maxlen=window)
+        self.stages = {name: deque(maxlen=window) for name in STAGES}
+
+    @contextmanager
+    def frame(self):
+        """
+        Profile the frame rendered inside the with block.
+        """
+        if getattr(_local, 'frame', None) is not None:
+            # Already inside a frame, e.g. fill() called by show_indices()
+            yield
+            return
+        _local.frame = record = {'stack': [], 'stages': {}}
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _local.frame = None
+            end = time.perf_counter()
+            self.count += 1
+            self.frames.append(end - start)
+            self.ends.append(end)
+            for name, elapsed in record['stages'].items():
+                self.stages.setdefault(name, deque(maxlen=self.window)).append(elapsed)
+
+    def fps(self, period=1.0):
+        """
+        Frames finished during the last period seconds, per second.
+        """
+        now = time.perf_counter()
+        return sum(1 for end in self.ends if now - end <= period) / period
+
+    def readout(self):
+        """
+        A one line summary for on-screen display.
+        """
+        parts = ['{:.0f} fps'.format(self.fps())]
+        if self.frames:
+            parts.append('frame {:.1f} ms'.format(1000 * self.frames[-1]))
+        for name in STAGES:
+            if self.stages[name]:
+                parts.append('{:s} {:.1f}'.format(name, 1000 * self.stages[name][-1]))
+        return '  '.join(parts)
+
+    def summary(self):
+        """
+        Statistics and histograms of the frames and of every stage in ms.
+        """
+        summary = {
+            'frames': self.count,
+            'window': self.window,
+            'frame_ms': latency_summary(self.frames),
+            'stages_ms': {name: latency_summary(samples) for name, samples in self.stages.items() if samples},
+        }
+        if len(self.ends) > 1 and self.ends[-1] > self.ends[0]:
+            summary['mean_fps'] = (len(self.ends) - 1) / (self.ends[-1] - self.ends[0])
+        return summary
+
+    def report(self):
+        """
+        The summary as text lines, one per stage.
+        """
+        summary = self.summary()
+        lines = ['{:d} frames'.format(summary['frames'])]
+        for name, values in [('frame', summary['frame_ms'])] + list(summary['stages_ms'].items()):
+            if values['count']:
+                lines.append('{:<9s} mean {:6.1f} ms  p50 {:6.1f} ms  p95 {:6.1f} ms  max {:6.1f} ms'.format(
+                    name, values['mean'], values['p50'], values['p95'], values['max']))
+        return '\n'.join(lines)
+
+    def dump(self, path, **metadata):
+        """
+        Write the summary and the given metadata (e.g. the files viewed) as JSON.
+        """
+        Path(path).write_text(json.dumps(dict(metadata, **self.summary()), indent=1))
+
+
+def latency_summary(samples):
+    """
+    Count, mean, percentiles and histogram of durations in seconds, reported in ms.
+    """
+    values = sorted(1000 * value for value in samples)
+    if not values:
+        return {'count': 0}
+
+    def percentile(q):
+        return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+    counts = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+    for value in values:
+        counts[bisect_right(HISTOGRAM_EDGES_MS, value)] += 1
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'max': values[-1],
+        'histogram': {'edges': list(HISTOGRAM_EDGES_MS), 'counts': counts},
+    }
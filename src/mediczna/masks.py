@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class PackedMask:
+    """
+    A binary mask held in memory at one bit per voxel.
+
+    Voxels are packed eight to a byte along x, so a mask takes an eighth of
+    a uint8 segmentation and a 32nd of an int32 one. Indexing unpacks only
+    the requested rows and returns boolean arrays, so viewers and metrics
+    take a PackedMask in place of a memmap. region() crops without unpacking.
+    """
+
+    def __init__(self, bits, width, columns=None):
+        """
+        :param bits: The (z, y, ceil(width / 8)) packed rows, see pack().
+        :param width: Number of voxels packed into each row.
+        :param columns: The (start, stop) range of x kept, all of them by default.
+        """
+        self.bits = bits
+        self.width = width
+        self.columns = (0, width) if columns is None else columns
+        self.shape = bits.shape[:2] + (self.columns[1] - self.columns[0],)
+        self.dtype = np.dtype(bool)
+        self.ndim = 3
+
+    @classmethod
+    def pack(cls, volume, chunk_size=16):
+        """
+        Pack the voxels > 0 of a volume indexed (z, y, x), chunk_size slices at a time.
+        """
+        depth, height, width = volume.shape[:3]
+        bits = np.empty((depth, height, -(-width // 8)), dtype=np.uint8)
+        for start in range(0, depth, chunk_size):
+            bits[start:start + chunk_size] = np.packbits(np.asarray(volume[start:start + chunk_size]) > 0, axis=-1)
+        return cls(bits, width)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[:]
+        return data if dtype is None else data.astype(dtype)
+
+    def _normalize(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > self.ndim:
+            raise IndexError('too many indices for a {:d}-dimensional mask'.format(self.ndim))
+        return key + (slice(None),) * (self.ndim - len(key))
+
+    def __getitem__(self, key):
+        z, y, x = self._normalize(key)
+        start, stop = self.columns
+        # Only the bytes holding the kept columns are unpacked
+        first, last = start // 8, -(-stop // 8)
+        rows = np.unpackbits(self.bits[z, y, first:last], axis=-1, count=8 * (last - first))
+        return rows[..., start - 8 * first:stop - 8 * first][..., x].view(bool)
+
+    def region(self, key):
+        """
+        A cropped view, key holds one step 1 slice per axis.
+        """
+        z, y, x = self._normalize(key)
+        first, last, step = x.indices(self.shape[2])
+        if step != 1 or z.step not in (None, 1) or y.step not in (None, 1):
+            raise ValueError('Only contiguous regions of a packed mask can be viewed')
+        start = self.columns[0]
+        return PackedMask(self.bits[z, y], self.width, (start + first, start + max(last, first)))
@@ -0,0 +1,190 @@
+import numpy as np
+from scipy.ndimage import binary_erosion, distance_transform_edt
+
+from mediczna.diff import BACKGROUND, FALSE_NEGATIVE, FALSE_POSITIVE, TRUE_POSITIVE, diff_codes
+
+OVERLAP_METRICS = ('dice', 'jaccard', 'precision', 'recall')
+SURFACE_METRICS = ('hd95', 'assd')
+
+
+def count_codes(truth, computed, chunk_size=16):
+    """
+    Count the diff codes of every slice in a single streaming pass.
+
+    Besides the counts, the pass collects the bounding box of the union of
+    both segmentations, which restricts the surface distance computations.
+
+    :param truth: The ground truth segmentation, indexed by slice.
+    :param computed: The computed segmentation, same shape as truth.
+    :param chunk_size: How many slices to process at once.
+    :return: A (n_slices, 4) array of code counts and the bounding box as a
+             tuple of slices, or None if both segmentations are empty.
+    """
+    n_slices = len(truth)
+    counts = np.empty((n_slices, 4), dtype=np.int64)
+    rows = np.zeros(truth.shape[1], dtype=bool)
+    cols = np.zeros(truth.shape[2], dtype=bool)
+    # intp, uint8 offsets would wrap from slice 64 of a chunk on
+    offsets = 4 * np.arange(chunk_size, dtype=np.intp)[:, None, None]
+
+    for start in range(0, n_slices, chunk_size):
+        codes = diff_codes(truth[start:start + chunk_size], computed[start:start + chunk_size])
+        n = len(codes)
+        counts[start:start + n] = np.bincount((codes + offsets[:n]).ravel(), minlength=4 * n).reshape(n, 4)
+        union = codes.any(axis=0)
+        rows |= union.any(axis=1)
+        cols |= union.any(axis=0)
+
+    planes = np.flatnonzero(counts[:, 1:].any(axis=1))
+    if not len(planes):
+        return counts, None
+    rows, cols = np.flatnonzero(rows), np.flatnonzero(cols)
+    roi = (slice(planes[0], planes[-1] + 1), slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+    return counts, roi
+
+
+def confusion_matrix(truth, computed, n_labels=None, chunk_size=16, names=('truth', 'computed')):
+    """
+    Count every (truth label, computed label) pair in a single streaming pass.
+
+    Each chunk of voxels is encoded as truth * n_labels + computed and
+    counted by one bincount, so the cost is linear in the number of voxels
+    whatever the number of labels, and no per-label masks are built.
+
+    :param truth: The ground truth label map, non-negative integers indexed by slice.
+    :param computed: The computed label map, same shape as truth.
+    :param n_labels: Number of labels including background, grown to the
+                     largest label found if not given or too small.
+    :param chunk_size: How many slices to process at once.
+    :param names: How truth and computed are called in errors, e.g. their files.
+    :return: An (n_labels, n_labels) int64 array, rows are truth labels and
+             columns computed labels.
+    :raises ValueError: If a label map is not of an integer type or has negative labels.
+    """
+    for labels, name in zip((truth, computed), names):
+        if labels.dtype.kind not in 'biu':
+            raise ValueError('{:s} is not a label map, its voxels are {:s} instead of integers'.format(
+                str(name), str(labels.dtype)))
+
+    n = n_labels or 1
+    matrix = np.zeros((n, n), dtype=np.int64)
+    for start in range(0, len(truth), chunk_size):
+        truth_chunk = np.asarray(truth[start:start + chunk_size])
+        computed_chunk = np.asarray(computed[start:start + chunk_size])
+        for labels, name in zip((truth_chunk, computed_chunk), names):
+            smallest = int(labels.min()) if labels.dtype.kind == 'i' and labels.size else 0
+            if smallest < 0:
+                raise ValueError('{:s} has the negative label {:d} in slices {:d} to {:d}'.format(
+                    str(name), smallest, start, start + len(labels) - 1))
+        largest = int(max(truth_chunk.max(), computed_chunk.max()))
+        if largest >= n:
+            grown = np.zeros((largest + 1, largest + 1), dtype=np.int64)
+            grown[:n, :n] = matrix
+            matrix, n = grown, largest + 1
+        pairs = truth_chunk.astype(np.intp) * n + computed_chunk
+        matrix += np.bincount(pairs.ravel(), minlength=n * n).reshape(n, n)
+    return matrix
+
+
+def label_counts(matrix):
+    """
+    Diff code counts of every label against all others from a confusion matrix.
+
+    Row label holds, in diff code order, the voxels that are that label in
+    neither segmentation, in both, only in truth and only in computed, so
+    overlap_metrics() of the result gives per-label Dice, Jaccard etc.
+    Row 0 compares the background.
+
+    :param matrix: A confusion matrix from confusion_matrix().
+    :return: An (n_labels, 4) int64 array.
+    """
+    matched = np.diagonal(matrix)
+    counts = np.empty((len(matrix), 4), dtype=np.int64)
+    counts[:, TRUE_POSITIVE] = matched
+    counts[:, FALSE_NEGATIVE] = matrix.sum(axis=1) - matched
+    counts[:, FALSE_POSITIVE] = matrix.sum(axis=0) - matched
+    counts[:, BACKGROUND] = matrix.sum() - counts[:, 1:].sum(axis=1)
+    return counts
+
+
+def overlap_metrics(counts):
+    """
+    Dice, Jaccard, precision and recall from diff code counts.
+
+    Works on a single (4,) count vector as well as on (n_slices, 4) arrays.
+    Metrics with an empty denominator are NaN.
+    """
+    tp = counts[..., TRUE_POSITIVE].astype(np.float64)
+    fn = counts[..., FALSE_NEGATIVE]
+    fp = counts[..., FALSE_POSITIVE]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'dice': 2 * tp / (2 * tp + fp + fn),
+            'jaccard': tp / (tp + fp + fn),
+            'precision': tp / (tp + fp),
+            'recall': tp / (tp + fn),
+        }
+
+
+def surface_metrics(truth, computed, spacing):
+    """
+    95th percentile Hausdorff distance and average symmetric surface distance.
+
+    Distances between the surface voxels of both masks are looked up in
+    Euclidean distance transforms, so the masks should be cropped to the
+    region of interest beforehand.
+
+    :param truth: Boolean ground truth mask (2D or 3D).
+    :param computed: Boolean computed mask, same shape as truth.
+    :param spacing: Voxel spacing along each axis.
+    :return: A dict with hd95 and assd, NaN if either mask is empty.
+    """
+    if not truth.any() or not computed.any():
+        return {'hd95': np.nan, 'assd': np.nan}
+
+    truth_surface = truth & ~binary_erosion(truth)
+    computed_surface = computed & ~binary_erosion(computed)
+
+    computed_to_truth = distance_transform_edt(~truth_surface, sampling=spacing)[computed_surface]
+    truth_to_computed = distance_transform_edt(~computed_surface, sampling=spacing)[truth_surface]
+
+    return {
+        'hd95': np.percentile(np.hstack((computed_to_truth, truth_to_computed)), 95),
+        'assd': (computed_to_truth.mean() + truth_to_computed.mean()) / 2,
+    }
+
+
+def evaluate(truth, computed, spacing=(1.0, 1.0, 1.0), chunk_size=16):
+    """
+    Compare a computed segmentation with the ground truth.
+
+    The overlap metrics come from one streaming pass over all slices. The
+    surface metrics only read the bounding box of the segmented region, per
+    volume and per slice.
+
+    :param truth: The ground truth segmentation, indexed (z, y, x).
+    :param computed: The computed segmentation, same shape as truth.
+    :param spacing: Voxel spacing in (z, y, x) order.
+    :param chunk_size: How many slices to process at once.
+    :return: A dict of volume metrics and a dict of per-slice metric arrays.
+    """
+    counts, roi = count_codes(truth, computed, chunk_size)
+
+    volume_metrics = {name: float(value) for name, value in overlap_metrics(counts.sum(axis=0)).items()}
+    slice_metrics = overlap_metrics(counts)
+    for name in SURFACE_METRICS:
+        slice_metrics[name] = np.full(len(truth), np.nan)
+
+    if roi is None:
+        volume_metrics.update({'hd95': np.nan, 'assd': np.nan})
+        return volume_metrics, slice_metrics
+
+    truth_roi = np.asarray(truth[roi]) > 0
+    computed_roi = np.asarray(computed[roi]) > 0
+    volume_metrics.update(surface_metrics(truth_roi, computed_roi, spacing))
+
+    for offset, index in enumerate(range(roi[0].start, roi[0].stop)):
+        for name, value in surface_metrics(truth_roi[offset], computed_roi[offset], spacing[1:]).items():
+            slice_metrics[name][index] = value
+
+    return volume_metrics, slice_metrics
@@ -0,0 +1,108 @@
+from pathlib import Path
+
+import numpy as np
+
+# MetaImage element types and their numpy counterparts
+ELEMENT_TYPES = {
+    'MET_CHAR': 'i1',
+    'MET_UCHAR': 'u1',
+    'MET_SHORT': 'i2',
+    'MET_USHORT': 'u2',
+    'MET_INT': 'i4',
+    'MET_UINT': 'u4',
+    'MET_LONG': 'i4',
+    'MET_ULONG': 'u4',
+    'MET_LONG_LONG': 'i8',
+    'MET_ULONG_LONG': 'u8',
+    'MET_FLOAT': 'f4',
+    'MET_DOUBLE': 'f8',
+}
+
+
+def read_header(path):
+    """
+    Parse the key = value lines of a .mhd header.
+
+    DimSize, ElementSpacing, Offset and ElementNumberOfChannels are converted
+    to numbers, everything else is kept as a string.
+
+    :param path: Path to the .mhd file.
+    :return: A dict with the header fields.
+    """
+    header = {}
+    with open(path, 'rb') as f:
+        for line in f:
+            key, sep, value = line.decode('ascii', errors='replace').partition('=')
+            if not sep:
+                continue
+            key, value = key.strip(), value.strip()
+            header[key] = value
+            if key == 'ElementDataFile':
+                # With LOCAL the binary data follows this line
+                header['_data_offset'] = f.tell()
+                break
+
+    header['DimSize'] = tuple(int(v) for v in header['DimSize'].split())
+    if 'ElementSpacing' in header:
+        header['ElementSpacing'] = tuple(float(v) for v in header['ElementSpacing'].split())
+    else:
+        header['ElementSpacing'] = (1.0,) * len(header['DimSize'])
+    if 'Offset' in header:
+        header['Offset'] = tuple(float(v) for v in header['Offset'].split())
+    header['ElementNumberOfChannels'] = int(header.get('ElementNumberOfChannels', 1))
+    return header
+
+
+def spacing(header):
+    """
+    The voxel spacing in array axis order, i.e. (z, y, x).
+    """
+    return header['ElementSpacing'][::-1]
+
+
+def load(path):
+    """
+    Memory-map the image data of a .mhd/.raw pair without reading it.
+
+    The array keeps the native element type and is indexed (z, y, x), so
+    indexing its first axis gives axial slices that are read from disk only
+    when they are accessed.
+
+    :param path: Path to the .mhd file.
+    :return: The np.memmap and the header dict.
+    """
+    path = Path(path)
+    header = read_header(path)
+
+    if header.get('CompressedData', 'False').lower() == 'true':
+        raise ValueError('Compressed MetaImage data cannot be memory-mapped: {:s}'.format(str(path)))
+    element_type = header['ElementType']
+    if element_type not in ELEMENT_TYPES:
+        raise ValueError('Unsupported element type "{:s}" in {:s}'.format(element_type, str(path)))
+
+    msb = header.get('ElementByteOrderMSB', header.get('BinaryDataByteOrderMSB', 'False'))
+    dtype = np.dtype(ELEMENT_TYPES[element_type]).newbyteorder('>' if msb.lower() == 'true' else '<')
+
+    shape = header['DimSize'][::-1]
+    if header['ElementNumberOfChannels'] > 1:
+        shape += (header['ElementNumberOfChannels'],)
+
+    data_file = header['ElementDataFile']
+    if data_file == 'LOCAL':
+        data_path = path
+        offset = header['_data_offset']
+    elif data_file == 'LIST' or '%' in data_file:
+        raise ValueError('Multi-file MetaImage data is not supported: {:s}'.format(str(path)))
+    else:
+        data_path = path.parent.joinpath(data_file)
+        offset = 0
+
+    header_size = int(header.get('HeaderSize', 0))
+    if header_size == -1:
+        # The data is stored at the very end of the file
+        offset = data_path.stat().st_size - int(np.prod(shape)) * dtype.itemsize
+    elif header_size > 0:
+        offset += header_size
+
+    image = np.memmap(data_path, dtype=dtype, mode='r', offset=offset, shape=shape)
+    return image, header
@@ -0,0 +1,140 @@
+import argparse
+from pathlib import Path
+
+from mediczna.plt_vis import add_case_arguments, load_case
+
+# Keys stepping the plane under the mouse pointer
+STEP_KEYS = {'up': 1, 'right': 1, 'pageup': 10, 'down': -1, 'left': -1, 'pagedown': -10}
+
+
+def get_program_parameters(argv=None):
+    description = 'Axial, coronal and sagittal planes of a case with linked crosshairs.'
+    epilogue = '''
+    Click or drag in a plane to move the crosshairs, which selects the planes
+    shown in the two other panels. Scroll or use the arrow keys to step through
+    the plane under the mouse pointer.
+    '''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def add_arguments(parser):
+    add_case_arguments(parser)
+    parser.add_argument('--slab-thickness', type=int, default=32,
+                        help='Coronal and sagittal planes are cached in slabs of this many planes')
+
+
+def case_spacing(args):
+    """
+    The (z, y, x) voxel spacing of the volume given on the command line, reoriented like load_case does.
+    """
+    from mediczna.chunked import open_volume
+    from mediczna.mhd import spacing
+    from mediczna.orientation import get
+
+    _, header = open_volume(Path(args.data_folder).joinpath(args.volume_filename))
+    voxel_spacing = spacing(header)
+    return voxel_spacing if args.orientation is None else get(args.orientation).spacing(voxel_spacing)
+
+
+def run(args):
+    import matplotlib.pyplot as plt
+
+    from mediczna.diff import LazyDiff, confusion_codes, diff_codes
+    from mediczna.overlay import DiffOverlay, SliceCache
+    from mediczna.planes import PLANE_NAMES, orthogonal_planes
+    from mediczna.slice_viewer import SliceViewer, sample_range
+
+    volume_img, truth_source_img, computed_img = load_case(args)
+    voxel_spacing = case_spacing(args)
+    shape = volume_img.shape[:3]
+
+    # Coronal and sagittal planes are read through slab caches, so moving
+    # them does not read across all slices of the volumes every time
+    volume_planes = orthogonal_planes(volume_img, args.slab_thickness)
+    truth_planes = orthogonal_planes(truth_source_img, args.slab_thickness)
+    computed_planes = orthogonal_planes(computed_img, args.slab_thickness)
+    volume_min, volume_max = sample_range(volume_img)
+    codes = confusion_codes if args.confusion else diff_codes
+
+    # Crosshair position in voxels, (z, y, x)
+    position = [size // 2 for size in shape]
+
+    fig, axs = plt.subplots(1, 3, figsize=(15, 5.5))
+    viewer = SliceViewer(fig)
+    panels = []
+    for axis, (ax, name) in enumerate(zip(axs, PLANE_NAMES)):
+        # The panel shows the two other axes as its rows and columns
+        rows, columns = [i for i in range(3) if i != axis]
+        overlay = SliceCache(DiffOverlay(volume_planes[axis],
+                                         LazyDiff(truth_planes[axis], computed_planes[axis], codes),
+                                         volume_min, volume_max), max_bytes=64 * 2 ** 20)
+        viewer.index = position[axis]
+        viewer.add_layer(ax, overlay, cmap=None, vmin=0, vmax=255)
+        ax.set_aspect(voxel_spacing[rows] / voxel_spacing[columns])
+        ax.set_title(name)
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+        vertical = ax.axvline(position[columns], color='yellow', linewidth=0.8)
+        horizontal = ax.axhline(position[rows], color='yellow', linewidth=0.8)
+        label = ax.text(0.02, 0.02, '', transform=ax.transAxes, color='yellow')
+        for artist in (vertical, horizontal, label):
+            viewer.add_animated(artist)
+        panels.append((ax, rows, columns, vertical, horizontal, label))
+
+    def update():
+        for axis, (_, rows, columns, vertical, horizontal, label) in enumerate(panels):
+            vertical.set_xdata([position[columns]] * 2)
+            horizontal.set_ydata([position[rows]] * 2)
+            label.set_text('{:d} / {:d}'.format(position[axis], shape[axis] - 1))
+        viewer.show_indices(position)
+
+    def panel_axis(ax):
+        return next((axis for axis, panel in enumerate(panels) if panel[0] is ax), None)
+
+    def move_crosshairs(event):
+        axis = panel_axis(event.inaxes)
+        if axis is None or event.button != 1 or event.xdata is None:
+            return
+        _, rows, columns, _, _, _ = panels[axis]
+        column = min(max(round(event.xdata), 0), shape[columns] - 1)
+        row = min(max(round(event.ydata), 0), shape[rows] - 1)
+        if (position[rows], position[columns]) != (row, column):
+            position[rows], position[columns] = row, column
+            update()
+
+    def step(axis, steps):
+        index = min(max(position[axis] + steps, 0), shape[axis] - 1)
+        if index != position[axis]:
+            position[axis] = index
+            update()
+
+    def scroll(event):
+        axis = panel_axis(event.inaxes)
+        if axis is not None:
+            step(axis, int(event.step))
+
+    def key_pressed(event):
+        axis = panel_axis(event.inaxes)
+        if axis is not None and event.key in STEP_KEYS:
+            step(axis, STEP_KEYS[event.key])
+
+    fig.canvas.mpl_connect('button_press_event', move_crosshairs)
+    fig.canvas.mpl_connect('motion_notify_event', move_crosshairs)
+    fig.canvas.mpl_connect('scroll_event', scroll)
+    fig.canvas.mpl_connect('key_press_event', key_pressed)
+    update()
+
+    plt.show()
+
+
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
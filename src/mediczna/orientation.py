@@ -0,0 +1,181 @@
+from functools import lru_cache
+
+import numpy as np
+
+from mediczna.chunked import crop_view
+
+# Signed permutation matrices acting on (x, y, z) coordinates, see SliceOrder
+# for the naming. They assume radiological views of the slices (viewed from
+# the feet).
+_BASE = {
+    'si': ((1, 0, 0), (0, 0, 1), (0, -1, 0)),
+    'is': ((1, 0, 0), (0, 0, -1), (0, -1, 0)),
+    'ap': ((1, 0, 0), (0, -1, 0), (0, 0, 1)),
+    'pa': ((1, 0, 0), (0, -1, 0), (0, 0, -1)),
+    'lr': ((0, 0, -1), (0, -1, 0), (1, 0, 0)),
+    'rl': ((0, 0, 1), (0, -1, 0), (1, 0, 0)),
+}
+
+# Views from the head: a 180 degree rotation about y applied after the above
+_HEAD_FIRST = ((-1, 0, 0), (0, 1, 0), (0, 0, -1))
+
+ORDERS = dict(_BASE, hf=_HEAD_FIRST)
+for _order, _matrix in _BASE.items():
+    ORDERS['hf' + _order] = tuple(map(tuple, np.dot(_HEAD_FIRST, _matrix).tolist()))
+
+
+class Orientation:
+    """
+    A slice order as an axis permutation with flips.
+
+    Volumes are indexed (z, y, x) and keep their voxels where they are:
+    apply() returns a transposed and flipped strided view of a numpy array, so
+    reorienting never copies the volume. vtk_transform() gives the same
+    transform for VTK geometry.
+    """
+
+    def __init__(self, order):
+        if order not in ORDERS:
+            raise ValueError('No such slice order "{:s}", expected one of {:s}'.format(order, ', '.join(ORDERS)))
+        self.order = order
+        self.matrix = np.array(ORDERS[order], dtype=int)
+
+        # Output (x, y, z) axis j takes input axis k, reversed if the entry is
+        # negative. Array axes are numbered in (z, y, x) order.
+        rows, columns = np.nonzero(self.matrix)
+        self.axes = tuple(int(2 - columns[2 - axis]) for axis in range(3))
+        self.flips = tuple(bool(self.matrix[2 - axis, columns[2 - axis]] < 0) for axis in range(3))
+
+    def __repr__(self):
+        return 'Orientation({:s})'.format(repr(self.order))
+
+    def shape(self, shape):
+        """
+        The (z, y, x) shape of a reoriented volume.
+        """
+        return tuple(shape[axis] for axis in self.axes) + tuple(shape[3:])
+
+    def spacing(self, spacing):
+        """
+        The voxel spacing of a reoriented volume, spacing in (z, y, x) order.
+        """
+        return tuple(spacing[axis] for axis in self.axes)
+
+    def apply(self, volume):
+        """
+        Reorient a volume indexed (z, y, x), trailing channel axes are kept.
+
+        :return: A view for numpy arrays (including memmaps), an OrientedVolume
+                 reading on demand for other array-likes.
+        """
+        if not isinstance(volume, np.ndarray):
+            return OrientedVolume(volume, self)
+        view = volume.transpose(self.axes + tuple(range(3, volume.ndim)))
+        flips = tuple(slice(None, None, -1) if flip else slice(None) for flip in self.flips)
+        return view[flips]
+
+    @lru_cache(maxsize=None)
+    def vtk_matrix(self):
+        """
+        The vtkMatrix4x4 of the orientation, shared, do not modify it.
+        """
+        from vtkmodules.vtkCommonMath import vtkMatrix4x4
+
+        matrix = vtkMatrix4x4()
+        matrix.Identity()
+        for row in range(3):
+            for column in range(3):
+                matrix.SetElement(row, column, float(self.matrix[row, column]))
+        return matrix
+
+    @lru_cache(maxsize=None)
+    def vtk_transform(self):
+        """
+        The vtkTransform of the orientation, shared, do not modify it.
+        """
+        from vtkmodules.vtkCommonTransforms import vtkTransform
+
+        transform = vtkTransform()
+        transform.SetMatrix(self.vtk_matrix())
+        return transform
+
+
+@lru_cache(maxsize=None)
+def get(order):
+    """
+    The cached Orientation of a slice order code, e.g. 'si' or 'hfsi'.
+    """
+    return Orientation(order)
+
+
+def reorient(volume, order):
+    """
+    Reorient a volume indexed (z, y, x), a no-op if order is None.
+    """
+    return volume if order is None else get(order).apply(volume)
+
+
+class OrientedVolume:
+    """
+    A reoriented view of an array-like that is not a numpy array, e.g. a
+    ChunkedVolume. Indexing reads only the requested voxels of the source.
+    """
+
+    def __init__(self, volume, orientation):
+        self.volume = volume
+        self.orientation = orientation
+        self.shape = orientation.shape(volume.shape)
+        self.dtype = volume.dtype
+        self.ndim = len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        return self.orientation.apply(np.asarray(self.volume, dtype=dtype))
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (3 - len(key))
+
+        # The same selection on the source axes, reversed where the axis is
+        # flipped. Axes indexed by a slice stay, in source order.
+        source_key = [slice(None)] * 3
+        for item, axis, flip, size in zip(key, self.orientation.axes, self.orientation.flips, self.shape):
+            if isinstance(item, slice):
+                if flip:
+                    start, stop, step = item.indices(size)
+                    stop = size - 1 - stop
+                    item = slice(size - 1 - start, stop if stop >= 0 else None, -step)
+            else:
+                index = int(item)
+                item = size - 1 - (index % size) if flip else index
+            source_key[axis] = item
+        data = self.volume[tuple(source_key)]
+
+        kept = [axis for item, axis in zip(key, self.orientation.axes) if isinstance(item, slice)]
+        return data.transpose(np.argsort(np.argsort(kept)))
+
+    def region(self, key):
+        """
+        A cropped view, key holds one step 1 slice per axis.
+        """
+        source_key = [slice(None)] * 3
+        for item, axis, flip, size in zip(key, self.orientation.axes, self.orientation.flips, self.shape):
+            start, stop, step = item.indices(size)
+            if step != 1:
+                raise ValueError('Only contiguous regions can be viewed')
+            source_key[axis] = slice(size - stop, size - start) if flip else slice(start, stop)
+        return OrientedVolume(crop_view(self.volume, tuple(source_key)), self.orientation)
+
+    def preview(self, index):
+        # The previews of the source are slices along its first axis only
+        if self.orientation.axes[0] != 0:
+            return None
+        data = getattr(self.volume, 'preview', lambda _: None)(
+            len(self) - 1 - index if self.orientation.flips[0] else index)
+        if data is None:
+            return None
+        data = data.T if self.orientation.axes[1] == 2 else data
+        return data[tuple(slice(None, None, -1) if flip else slice(None) for flip in self.orientation.flips[1:])]
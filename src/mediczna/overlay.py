@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib import colormaps
+
+from mediczna.chunked import preview
+from mediczna.diff import FALSE_NEGATIVE, FALSE_POSITIVE, MISLABELED, TRUE_POSITIVE
+from mediczna.frame_profile import stage
+
+DIFF_CMAPS = {TRUE_POSITIVE: 'Purples', FALSE_NEGATIVE: 'Blues', FALSE_POSITIVE: 'Reds', MISLABELED: 'Oranges'}
+
+
+def build_lut(cmap='Greys', alpha=0.2):
+    """
+    Build the RGBA lookup table used to composite the diff panel.
+
+    Row code * 256 + grey holds the volume colour for a grey level in [0, 255]
+    blended with the colour of the given diff code.
+
+    :param cmap: The colormap of the volume.
+    :param alpha: Opacity of the diff colours.
+    :return: A (1280, 4) uint8 array.
+    """
+    grey = colormaps[cmap](np.linspace(0, 1, 256))
+    lut = np.empty((len(DIFF_CMAPS) + 1, 256, 4))
+    lut[0] = grey
+    for code, name in DIFF_CMAPS.items():
+        lut[code] = (1 - alpha) * grey + alpha * np.array(colormaps[name](1.0))
+    lut[..., 3] = 1
+    return np.round(lut * 255).astype(np.uint8).reshape(-1, 4)
+
+
+class DiffOverlay:
+    """
+    Composites a volume slice and its diff codes into one RGBA image.
+    """
+
+    def __init__(self, volume, codes, vmin, vmax, cmap='Greys', alpha=0.2):
+        self.volume = volume
+        self.codes = codes
+        self.vmin = np.float32(vmin)
+        self.scale = np.float32(255 / max(float(vmax) - float(vmin), 1))
+        self.lut = build_lut(cmap, alpha)
+
+    def __len__(self):
+        return len(self.volume)
+
+    def __getitem__(self, index):
+        return self.composite(self.volume[index], self.codes[index])
+
+    def preview(self, index):
+        """
+        The composite of the previews of slice index, None if neither source has one.
+        """
+        volume, codes = preview(self.volume, index), preview(self.codes, index)
+        if volume is None and codes is None:
+            return None
+        return self.composite(self.volume[index] if volume is None else volume,
+                              self.codes[index] if codes is None else codes)
+
+    def composite(self, volume, codes):
+        with stage('colormap'):
+            grey = np.clip((volume - self.vmin) * self.scale, 0, 255).astype(np.uint16)
+            return self.lut[codes * np.uint16(256) + grey]
+
+
+class ColormapSlices:
+    """
+    Maps the slices of a volume to RGBA images like imshow with a linear norm.
+    """
+
+    def __init__(self, volume, cmap, vmin, vmax):
+        self.volume = volume
+        self.vmin = np.float32(vmin)
+        self.scale = np.float32(255 / max(float(vmax) - float(vmin), 1))
+        self.lut = np.round(colormaps[cmap](np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+
+    def __len__(self):
+        return len(self.volume)
+
+    def __getitem__(self, index):
+        with stage('colormap'):
+            return self.lut[np.clip((self.volume[index] - self.vmin) * self.scale, 0, 255).astype(np.uint8)]
+
+
+class SliceCache:
+    """
+    A size-bounded LRU cache of slices computed by an indexable source.
+
+    Safe to index from several threads, slices are computed outside the lock.
+    """
+
+    def __init__(self, source, max_bytes=256 * 2 ** 20):
+        self.source = source
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._slices = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.source)
+
+    def __contains__(self, index):
+        return index in self._slices
+
+    def preview(self, index):
+        if index in self._slices:
+            return None
+        return preview(self.source, index)
+
+    def __getitem__(self, index):
+        with self._lock:
+            try:
+                self._slices.move_to_end(index)
+                return self._slices[index]
+            except KeyError:
+                pass
+
+        data = self.source[index]
+
+        with self._lock:
+            if index not in self._slices:
+                self._slices[index] = data
+                self.nbytes += data.nbytes
+            while self.nbytes > self.max_bytes and len(self._slices) > 1:
+                _, evicted = self._slices.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return data
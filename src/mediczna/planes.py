@@ -0,0 +1,59 @@
+from mediczna.chunked import SlabCache
+
+# Planes perpendicular to the array axes of a volume indexed (z, y, x)
+PLANE_NAMES = ('Axial', 'Coronal', 'Sagittal')
+
+
+class Planes:
+    """
+    Slices of a volume along one of its axes.
+
+    Indexing gives the plane at that position along the axis, so a Planes
+    object can be shown by a SliceViewer like a volume sliced along its first
+    axis.
+    """
+
+    def __init__(self, volume, axis, slabs=None):
+        self.volume = volume
+        self.axis = axis
+        self.slabs = slabs
+        self.shape = (volume.shape[axis],) + tuple(size for i, size in enumerate(volume.shape) if i != axis)
+        self.dtype = volume.dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        size = len(self)
+        index = int(index)
+        if not -size <= index < size:
+            raise IndexError('index {:d} is out of bounds for axis with size {:d}'.format(index, size))
+        index %= size
+
+        if self.slabs is not None:
+            return self.slabs.plane(index)
+        return self.volume[(slice(None),) * self.axis + (index,)]
+
+    def preview(self, index):
+        # Only the planes along the first axis are slices of the volume
+        if self.axis != 0:
+            return None
+        volume_preview = getattr(self.volume, 'preview', None)
+        return None if volume_preview is None else volume_preview(index)
+
+
+def orthogonal_planes(volume, thickness=32, cache_bytes=512 * 2 ** 20):
+    """
+    The axial, coronal and sagittal planes of a volume indexed (z, y, x).
+
+    Axial planes are slices and are read directly. Coronal and sagittal planes
+    are read through a SlabCache each, which copies slabs of thickness planes
+    so that the neighbouring planes are contiguous in memory.
+
+    :param volume: A numpy array, memmap, ChunkedVolume or OrientedVolume.
+    :param thickness: Planes per cached slab.
+    :param cache_bytes: Memory the slabs of both axes may take.
+    :return: A tuple of three Planes.
+    """
+    return (Planes(volume, 0),) + tuple(
+        Planes(volume, axis, SlabCache(volume, axis, thickness, cache_bytes // 2)) for axis in (1, 2))
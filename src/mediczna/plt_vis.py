@@ -0,0 +1,238 @@
+# links
+# # https://stackoverflow.com/questions/31877353/overlay-an-image-segmentation-with-numpy-and-matplotlib
+import argparse
+from pathlib import Path
+
+# Keys jumping to the next/previous labelled slice and the next/previous
+# slice where the segmentations disagree
+JUMP_KEYS = {
+    'n': ('next', False),
+    'N': ('previous', False),
+    'd': ('next', True),
+    'D': ('previous', True),
+}
+
+
+def get_program_parameters(argv=None):
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def add_arguments(parser):
+    add_case_arguments(parser)
+    parser.add_argument('--precompute-diff', action='store_true',
+                        help='Compute the diff of all slices on startup instead of on display')
+    parser.add_argument('--crop', action='store_true',
+                        help='Crop all panels to the region containing truth or computed labels')
+    parser.add_argument('--prefetch', type=int, metavar='THREADS',
+                        help='Threads preparing the slices ahead of the scrub direction, 0 to disable '
+                             '(default: all but one CPU)')
+    add_profile_arguments(parser)
+
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', metavar='JSON',
+                        help='Time every frame by stage and write the statistics to this file on exit')
+    parser.add_argument('--readout', action='store_true', help='Show the frame rate and stage timings on screen')
+
+
+def add_case_arguments(parser):
+    parser.add_argument('data_folder', help='The path to segmentation and volume mhd/raw files (or .chunked folders)')
+    parser.add_argument('volume_filename', help='e.g. volume_14.mhd or volume_14.chunked')
+    parser.add_argument('true_segmentation_filename', help='e.g segmentation_14.mhd')
+    parser.add_argument('computed_segmentation_filename', help='e.g segmentation_14.mhd')
+    add_orientation_argument(parser)
+    # Packed masks keep only labelled or not, the confusion classes need the labels
+    masks = parser.add_mutually_exclusive_group()
+    masks.add_argument('--pack-masks', action='store_true',
+                       help='Read the segmentations into memory as masks packed at one bit per voxel')
+    masks.add_argument('--confusion', action='store_true',
+                       help='Colour voxels the segmentations give different labels apart in the diff')
+
+
+def add_orientation_argument(parser, default=None):
+    parser.add_argument('--orientation', metavar='ORDER', default=default,
+                        help='Reorient the volumes by a slice order: si, is, ap, pa, lr, rl, hf or hf followed by '
+                             'one of the others (e.g. hfsi), {:s} by default'.format(
+                                 'the order on disk' if default is None else default))
+
+
+def load_case(args):
+    """
+    Open the volume, truth source and computed segmentation given on the command line.
+
+    .mhd files are memory-mapped, converted volumes read their chunks on demand.
+    Reorienting only creates views as well. With --pack-masks the
+    segmentations are read once into PackedMasks, which stay in memory at an
+    eighth of a uint8 mask, e.g. to compare many cases or sagittal planes
+    without going back to disk. The volume keeps its native dtype either way.
+    """
+    from mediczna.chunked import open_volume
+    from mediczna.masks import PackedMask
+    from mediczna.orientation import reorient
+
+    path = Path(args.data_folder)
+    volume_img, _ = open_volume(path.joinpath(args.volume_filename))
+    truth_source_img, _ = open_volume(path.joinpath(args.true_segmentation_filename))
+    computed_img, _ = open_volume(path.joinpath(args.computed_segmentation_filename))
+    volume_img, truth_source_img, computed_img = (reorient(image, args.orientation)
+                                                  for image in (volume_img, truth_source_img, computed_img))
+    if args.pack_masks:
+        truth_source_img, computed_img = PackedMask.pack(truth_source_img), PackedMask.pack(computed_img)
+    return volume_img, truth_source_img, computed_img
+
+
+def create_diff_view(fig, volume_img, truth_source_img, computed_img, precompute_diff=False, progressive=False,
+                     debounce=False, executor=None, profile=None, confusion=False):
+    """
+    Lay out the truth source, diff and computed panels on a figure.
+
+    With progressive, converted volumes show coarse previews while scrubbing.
+    With debounce, SliceViewer.request() merges rapid slider events. Given an
+    executor, the slices of every panel are prepared ahead of the scrub
+    direction on its threads. Given a FrameProfile, every frame is timed.
+    With confusion, the diff colours the voxels given different labels
+    (MISLABELED) apart from the matching ones.
+
+    :return: The SliceViewer driving the panels.
+    """
+    from mediczna.diff import LazyDiff, confusion_codes, diff_codes, diff_volume
+    from mediczna.overlay import DiffOverlay, SliceCache
+    from mediczna.prefetch import Prefetcher
+    from mediczna.slice_viewer import SliceViewer, sample_range
+
+    def layer(source):
+        return source if executor is None else Prefetcher(source, executor)
+
+    axs = fig.subplots(1, 3)
+    truth_source = axs[0]
+    diff = axs[1]
+    computed = axs[2]
+
+    for ax in axs:
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+    truth_source.set_title('Truth source')
+    computed.set_title('Computed')
+    diff.set_title('Diff')
+
+    # Every layer gets one persistent image with a fixed norm, so an empty first
+    # slice does not break the colour mapping of the following ones
+    viewer = SliceViewer(fig, progressive, debounce, profile)
+    viewer.add_layer(truth_source, layer(truth_source_img), cmap='Blues', vmin=0, interpolation='nearest')
+    viewer.add_layer(computed, layer(computed_img), cmap='Reds', vmin=0, interpolation='nearest')
+
+    # Diff codes: intersection, truth minus computed and computed minus truth as
+    # a single uint8 label per voxel, and with confusion different labels too
+    codes = confusion_codes if confusion else diff_codes
+    if precompute_diff:
+        diff_img = diff_volume(truth_source_img, computed_img, codes=codes)
+    else:
+        diff_img = LazyDiff(truth_source_img, computed_img, codes)
+
+    # The diff panel is a single RGBA image: the volume slice with the diff
+    # codes blended in
+    volume_min, volume_max = sample_range(volume_img)
+    diff_overlay = SliceCache(DiffOverlay(volume_img, diff_img, volume_min, volume_max))
+    viewer.add_layer(diff, layer(diff_overlay), cmap=None, vmin=0, vmax=255)
+    return viewer
+
+
+def run(args):
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Slider, Button
+
+    from mediczna.chunked import crop_view
+    from mediczna.frame_profile import FrameProfile
+    from mediczna.prefetch import prefetch_executor
+    from mediczna.roi import SliceIndex
+
+    # Load mhd files, the data is memory-mapped and read slice by slice on display
+    volume_img, truth_source_img, computed_img = load_case(args)
+
+    # Slices with labels, built in one pass over the segmentations when it is
+    # first needed
+    slice_index = None
+    if args.crop:
+        slice_index = SliceIndex.build(truth_source_img, computed_img)
+        rows, columns = slice_index.crop(volume_img.shape)
+        # Cropping memory-mapped or chunked volumes only creates views
+        volume_img = crop_view(volume_img, (slice(None), rows, columns))
+        truth_source_img = crop_view(truth_source_img, (slice(None), rows, columns))
+        computed_img = crop_view(computed_img, (slice(None), rows, columns))
+
+    # Prepare the plot
+    fig = plt.figure()
+    executor = None if args.prefetch == 0 else prefetch_executor(args.prefetch)
+    profile = FrameProfile() if args.profile or args.readout else None
+    viewer = create_diff_view(fig, volume_img, truth_source_img, computed_img, args.precompute_diff,
+                              progressive=True, debounce=True, executor=executor, profile=profile,
+                              confusion=args.confusion)
+    if args.readout:
+        viewer.add_readout()
+
+    # Adjust the main plot to make room for the sliders
+    fig.subplots_adjust(bottom=0.25, hspace=0.5)
+
+    # Make a horizontal slider to control the displayed frame
+    axfreq = plt.axes([0.25, 0.1, 0.65, 0.03])
+    frame_slider = Slider(
+        ax=axfreq,
+        label='Frame',
+        valmin=0,
+        valmax=volume_img.shape[0] - 1,
+        valinit=0,
+        valfmt="%i"
+    )
+    # The slider is redrawn together with the images instead of the whole figure
+    frame_slider.drawon = False
+    viewer.add_animated(axfreq)
+
+    # The function to be called anytime a slider's value changes, a drag
+    # renders only the latest value once the GUI catches up
+    def update(val):
+        viewer.request(round(val))
+
+    # Register the update function with the slider
+    frame_slider.on_changed(update)
+
+    # Create a `matplotlib.widgets.Button` to reset the slider to initial value
+    resetax = plt.axes([0.8, 0.025, 0.1, 0.04])
+    button = Button(resetax, 'Reset', hovercolor='0.975')
+
+    def reset(event):
+        frame_slider.reset()
+
+    button.on_clicked(reset)
+
+    def jump(event):
+        nonlocal slice_index
+        if event.key not in JUMP_KEYS:
+            return
+        if slice_index is None:
+            slice_index = SliceIndex.build(truth_source_img, computed_img)
+        direction, disagreeing = JUMP_KEYS[event.key]
+        index = getattr(slice_index, direction)(round(frame_slider.val), disagreeing)
+        if index is not None:
+            frame_slider.set_val(index)
+
+    fig.canvas.mpl_connect('key_press_event', jump)
+
+    plt.show()
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    if args.profile:
+        profile.dump(args.profile, viewer='view', data_folder=str(args.data_folder),
+                     files=[args.volume_filename, args.true_segmentation_filename, args.computed_segmentation_filename])
+        print(profile.report())
+
+
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
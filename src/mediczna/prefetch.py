@@ -0,0 +1,94 @@
+import os
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import numpy as np
+
+from mediczna.chunked import preview
+
+# Slices prepared ahead of the displayed one in the scrub direction, and kept
+# behind it for small reversals
+AHEAD = 8
+BEHIND = 2
+
+
+def prefetch_executor(workers=None):
+    """
+    A thread pool shared by the Prefetchers of one view.
+
+    :param workers: Number of threads, all but one of the CPUs if omitted.
+    """
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 2) - 1)
+    return ThreadPoolExecutor(workers, thread_name_prefix='prefetch')
+
+
+class Prefetcher:
+    """
+    Prepares the slices of a source ahead of the scrub direction on background threads.
+
+    Indexing returns the prepared slice if it is ready, waits for it if it is
+    being prepared, and reads the source otherwise. Every access moves the
+    window of prepared slices along; jobs that fell out of it are cancelled if
+    they have not started yet.
+
+    Slices of memory-mapped sources are copied by the jobs, indexing a memmap
+    only maps the slice and its pages would still be read on the first paint.
+
+    The source has to be safe to index from several threads, which memmaps,
+    ChunkedVolumes, LazyDiffs, DiffOverlays and SliceCaches are.
+    """
+
+    def __init__(self, source, executor, ahead=AHEAD, behind=BEHIND):
+        self.source = source
+        self.executor = executor
+        self.ahead = ahead
+        self.behind = behind
+        self.direction = 1
+        self._last = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.source)
+
+    def __getitem__(self, index):
+        job = self._advance(index)
+        if job is not None:
+            try:
+                return job.result()
+            except CancelledError:
+                pass
+        return self.source[index]
+
+    def preview(self, index):
+        job = self._advance(index)
+        if job is not None and job.done() and not job.cancelled():
+            return None
+        return preview(self.source, index)
+
+    def _advance(self, index):
+        """
+        Move the window to index and return the job of index, if any.
+        """
+        with self._lock:
+            if self._last is not None and index != self._last:
+                self.direction = 1 if index > self._last else -1
+            self._last = index
+
+            wanted = [index + self.direction * step for step in range(1, self.ahead + 1)]
+            wanted += [index - self.direction * step for step in range(1, self.behind + 1)]
+            wanted = [i for i in wanted if 0 <= i < len(self.source)]
+
+            keep = set(wanted) | {index}
+            for stale in [i for i in self._jobs if i not in keep]:
+                self._jobs.pop(stale).cancel()
+            # Nearest first, the pool runs jobs in submission order
+            for i in wanted:
+                if i not in self._jobs:
+                    self._jobs[i] = self.executor.submit(self._load, i)
+            return self._jobs.get(index)
+
+    def _load(self, index):
+        image = self.source[index]
+        return np.array(image) if isinstance(image, np.memmap) else image
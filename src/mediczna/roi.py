@@ -0,0 +1,50 @@
+import numpy as np
+
+from mediczna.diff import FALSE_NEGATIVE, FALSE_POSITIVE
+from mediczna.metrics import count_codes
+
+
+class SliceIndex:
+    """
+    Which slices contain labels or disagreements, and where the labels are.
+
+    Built from the diff code counts of a single pass over both segmentations.
+    """
+
+    def __init__(self, counts, bbox):
+        self.labelled = np.flatnonzero(counts[:, 1:].any(axis=1))
+        self.disagreeing = np.flatnonzero(counts[:, FALSE_NEGATIVE] + counts[:, FALSE_POSITIVE])
+        self.bbox = bbox
+
+    @classmethod
+    def build(cls, truth, computed, chunk_size=16):
+        return cls(*count_codes(truth, computed, chunk_size))
+
+    def next(self, index, disagreeing=False):
+        """
+        The first labelled (or disagreeing) slice after index, None if there is none.
+        """
+        indices = self.disagreeing if disagreeing else self.labelled
+        position = np.searchsorted(indices, index, side='right')
+        return int(indices[position]) if position < len(indices) else None
+
+    def previous(self, index, disagreeing=False):
+        """
+        The last labelled (or disagreeing) slice before index, None if there is none.
+        """
+        indices = self.disagreeing if disagreeing else self.labelled
+        position = np.searchsorted(indices, index, side='left')
+        return int(indices[position - 1]) if position > 0 else None
+
+    def crop(self, shape, margin=8):
+        """
+        The in-plane region of interest, grown by margin voxels.
+
+        :param shape: The (z, y, x) shape of the volume.
+        :param margin: How many voxels to keep around the labels.
+        :return: (rows, columns) slices, the whole plane if nothing is labelled.
+        """
+        if self.bbox is None:
+            return slice(None), slice(None)
+        return tuple(slice(max(axis.start - margin, 0), min(axis.stop + margin, size))
+                     for axis, size in zip(self.bbox[1:], shape[1:]))
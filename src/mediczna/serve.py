@@ -0,0 +1,366 @@
+import argparse
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+from mediczna.plt_vis import add_case_arguments, load_case
+
+# Panels of the three-panel view, left to right
+PANELS = ('truth', 'diff', 'computed')
+
+# Tile encodings: (Pillow format, MIME type, save options)
+FORMATS = {
+    'png': ('PNG', 'image/png', {'compress_level': 1}),
+    'webp': ('WEBP', 'image/webp', {'lossless': True, 'quality': 0}),
+}
+
+# Browsers may reuse a tile without asking for this many seconds, then
+# revalidate it by its ETag
+MAX_AGE = 600
+
+
+def get_program_parameters(argv=None):
+    description = 'Serve the truth source, diff and computed panels of a case as tiles to a browser viewer.'
+    epilogue = '''
+    The case is opened once, every request of every reviewer is rendered from
+    the same volumes. The panels are rendered like the view command, cut into
+    tiles and encoded as PNG or WebP. Encoded tiles are kept in an LRU cache
+    and carry an ETag, so a browser revisiting a slice gets 304 Not Modified
+    without anything being rendered. Requests are handled on a thread each.
+
+    Open http://HOST:PORT/ for the viewer, /info gives the case layout as JSON
+    and /tile/PANEL/SLICE/ROW/COLUMN.FORMAT a single tile.
+    '''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def add_arguments(parser):
+    add_case_arguments(parser)
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on, 0.0.0.0 for all interfaces')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on, 0 picks a free one')
+    parser.add_argument('--tile-size', type=int, default=256, help='Width and height of a tile in pixels')
+    parser.add_argument('--cache-mb', type=float, default=256, help='Memory for encoded tiles')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+
+
+class CaseTiles:
+    """
+    Encoded tiles of the panels of one case, shared by all requests.
+
+    Panel slices are rendered once into SliceCaches and cut into tiles, the
+    encoded tiles are kept in a size-bounded LRU cache. Safe to use from
+    several threads, tiles are rendered and encoded outside the lock, and
+    reviewers asking for a tile being rendered wait for it instead of
+    rendering it again.
+    """
+
+    def __init__(self, volume_img, truth_source_img, computed_img, tile_size=256, cache_bytes=256 * 2 ** 20,
+                 confusion=False, tag=''):
+        """
+        :param tag: Identifies the case and options in the ETags, see case_tag().
+        """
+        from mediczna.diff import LazyDiff, confusion_codes, diff_codes
+        from mediczna.overlay import ColormapSlices, DiffOverlay, SliceCache
+        from mediczna.slice_viewer import sample_range
+
+        volume_min, volume_max = sample_range(volume_img)
+        codes = confusion_codes if confusion else diff_codes
+        # The colours of the view command, see plt_vis.create_diff_view()
+        sources = {
+            'truth': ColormapSlices(truth_source_img, 'Blues', 0, sample_range(truth_source_img)[1]),
+            'diff': DiffOverlay(volume_img, LazyDiff(truth_source_img, computed_img, codes),
+                                volume_min, volume_max),
+            'computed': ColormapSlices(computed_img, 'Reds', 0, sample_range(computed_img)[1]),
+        }
+        self.panels = {name: SliceCache(source, max_bytes=64 * 2 ** 20) for name, source in sources.items()}
+        self.shape = volume_img.shape[:3]
+        self.tile_size = tile_size
+        self.cache_bytes = cache_bytes
+        self.tag = tag
+        self.nbytes = 0
+        self._tiles = OrderedDict()
+        self._rendering = {}
+        self._lock = threading.Lock()
+
+    def info(self):
+        """
+        The layout of the case for the viewer.
+        """
+        slices, height, width = self.shape
+        return {
+            'slices': slices, 'height': height, 'width': width, 'tile_size': self.tile_size,
+            'rows': -(-height // self.tile_size), 'columns': -(-width // self.tile_size),
+            'panels': list(PANELS), 'formats': list(FORMATS),
+        }
+
+    def etag(self, key):
+        """
+        The ETag of a tile, known without rendering it.
+        """
+        return '"{:s}-{:s}"'.format(self.tag, '-'.join(str(part) for part in key))
+
+    def check(self, panel, index, row, column, image_format):
+        """
+        Raise KeyError for an unknown panel or format and IndexError for a tile outside the case.
+        """
+        if panel not in self.panels or image_format not in FORMATS:
+            raise KeyError(panel if panel not in self.panels else image_format)
+        info = self.info()
+        if not (0 <= index < info['slices'] and 0 <= row < info['rows'] and 0 <= column < info['columns']):
+            raise IndexError('No tile {:d}/{:d}/{:d}'.format(index, row, column))
+
+    def tile(self, panel, index, row, column, image_format='png'):
+        """
+        The encoded tile of a panel slice, rendered if it is not cached.
+        """
+        self.check(panel, index, row, column, image_format)
+        key = (panel, index, row, column, image_format)
+        with self._lock:
+            try:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+            except KeyError:
+                pass
+            rendering = self._rendering.get(key)
+            if rendering is None:
+                self._rendering[key] = future = Future()
+        if rendering is not None:
+            return rendering.result()
+
+        try:
+            size = self.tile_size
+            image = self.panels[panel][index][row * size:(row + 1) * size, column * size:(column + 1) * size]
+            data = encode(image, image_format)
+        except BaseException as e:
+            with self._lock:
+                del self._rendering[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._rendering[key]
+            self._tiles[key] = data
+            self.nbytes += len(data)
+            while self.nbytes > self.cache_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self.nbytes -= len(evicted)
+        future.set_result(data)
+        return data
+
+
+def encode(image, image_format):
+    """
+    Encode an RGBA uint8 image with Pillow.
+    """
+    import io
+
+    from PIL import Image
+
+    pillow_format, _, options = FORMATS[image_format]
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format=pillow_format, **options)
+    return buffer.getvalue()
+
+
+def case_tag(args):
+    """
+    A short hash of the files served and the options changing the tiles.
+
+    It changes when a file is rewritten, so ETags of a previous run do not
+    match tiles of different data.
+    """
+    path = Path(args.data_folder)
+    parts = [str(args.orientation), str(args.pack_masks), str(args.confusion), str(args.tile_size)]
+    for name in (args.volume_filename, args.true_segmentation_filename, args.computed_segmentation_filename):
+        stat = path.joinpath(name).stat()
+        parts += [str(path.joinpath(name).resolve()), str(stat.st_mtime_ns), str(stat.st_size)]
+    return hashlib.sha1('\0'.join(parts).encode()).hexdigest()[:12]
+
+
+def make_handler(tiles, verbose=False):
+    """
+    A request handler class serving the viewer, the case layout and the tiles of tiles.
+    """
+    from http import HTTPStatus
+    from http.server import BaseHTTPRequestHandler
+
+    info = json.dumps(tiles.info()).encode()
+    page = VIEWER_HTML.encode()
+
+    class TileHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path in ('/', '/index.html'):
+                self.send_body(page, 'text/html; charset=utf-8', 'no-cache')
+            elif path == '/info':
+                self.send_body(info, 'application/json', 'no-cache')
+            elif path.startswith('/tile/'):
+                self.send_tile(path[len('/tile/'):])
+            else:
+                self.send_error(HTTPStatus.NOT_FOUND)
+
+        def send_tile(self, path):
+            try:
+                panel, index, row, name = path.split('/')
+                column, image_format = name.split('.')
+                key = (panel, int(index), int(row), int(column), image_format)
+                tiles.check(*key)
+            except (ValueError, KeyError, IndexError):
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            etag = tiles.etag(key)
+            if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'max-age={:d}'.format(MAX_AGE))
+                self.end_headers()
+                return
+            self.send_body(tiles.tile(*key), FORMATS[image_format][1], 'max-age={:d}'.format(MAX_AGE), etag)
+
+        def send_body(self, body, content_type, cache_control, etag=None):
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', cache_control)
+            if etag:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+    return TileHandler
+
+
+def create_server(tiles, host='127.0.0.1', port=8000, verbose=False):
+    """
+    A ThreadingHTTPServer for the tiles, call serve_forever() to start it.
+    """
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), make_handler(tiles, verbose))
+    server.daemon_threads = True
+    return server
+
+
+def run(args):
+    # The case is opened once and shared by all requests
+    tiles = CaseTiles(*load_case(args), tile_size=args.tile_size, cache_bytes=int(args.cache_mb * 2 ** 20),
+                      confusion=args.confusion, tag=case_tag(args))
+    server = create_server(tiles, args.host, args.port, args.verbose)
+    host, port = server.server_address[:2]
+    print('Serving {:s} on http://{:s}:{:d}/ (Ctrl+C to stop)'.format(args.volume_filename, host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+VIEWER_HTML = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>mediczna</title>
+<style>
+  body { font-family: sans-serif; margin: 1em; background: #fafafa; }
+  #panels { display: flex; gap: 1em; flex-wrap: wrap; }
+  .panel h3 { margin: 0.2em 0; font-weight: normal; }
+  .tiles { display: grid; line-height: 0; }
+  .tiles img { display: block; image-rendering: pixelated; }
+  #controls { margin: 1em 0; display: flex; gap: 1em; align-items: center; }
+  #slider { width: 60%; }
+</style>
+</head>
+<body>
+<div id="controls">
+  <input id="slider" type="range" min="0" value="0">
+  <span id="label"></span>
+  <select id="format"></select>
+</div>
+<div id="panels"></div>
+<script>
+const titles = {truth: 'Truth source', diff: 'Diff', computed: 'Computed'};
+let info, index = 0, pending = false;
+
+function tileUrl(panel, row, column) {
+  const format = document.getElementById('format').value;
+  return `/tile/${panel}/${index}/${row}/${column}.${format}`;
+}
+
+// Only the latest slider position is requested once per animation frame
+function update() {
+  pending = false;
+  document.getElementById('label').textContent = `Slice ${index} / ${info.slices - 1}`;
+  for (const img of document.querySelectorAll('.tiles img')) {
+    img.src = tileUrl(img.dataset.panel, img.dataset.row, img.dataset.column);
+  }
+}
+
+function show(value) {
+  index = Math.min(Math.max(value, 0), info.slices - 1);
+  document.getElementById('slider').value = index;
+  if (!pending) {
+    pending = true;
+    requestAnimationFrame(update);
+  }
+}
+
+fetch('/info').then(response => response.json()).then(data => {
+  info = data;
+  const slider = document.getElementById('slider');
+  slider.max = info.slices - 1;
+  slider.addEventListener('input', () => show(Number(slider.value)));
+  const format = document.getElementById('format');
+  for (const name of info.formats) format.add(new Option(name, name));
+  format.addEventListener('change', update);
+  for (const panel of info.panels) {
+    const div = document.createElement('div');
+    div.className = 'panel';
+    div.innerHTML = `<h3>${titles[panel] || panel}</h3>`;
+    const grid = document.createElement('div');
+    grid.className = 'tiles';
+    grid.style.gridTemplateColumns = `repeat(${info.columns}, max-content)`;
+    for (let row = 0; row < info.rows; row++) {
+      for (let column = 0; column < info.columns; column++) {
+        const img = document.createElement('img');
+        Object.assign(img.dataset, {panel, row, column});
+        grid.appendChild(img);
+      }
+    }
+    div.appendChild(grid);
+    document.getElementById('panels').appendChild(div);
+  }
+  document.addEventListener('keydown', event => {
+    const step = {ArrowUp: 1, ArrowRight: 1, ArrowDown: -1, ArrowLeft: -1, PageUp: 10, PageDown: -10}[event.key];
+    if (step) {
+      event.preventDefault();
+      show(index + step);
+    }
+  });
+  show(Math.floor(info.slices / 2));
+});
+</script>
+</body>
+</html>
+'''
+
+
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+from mediczna import orientation
+
+
+class SliceOrder:
+    """
+    These transformations permute image and other geometric data to maintain proper
+     orientation regardless of the acquisition order. After applying these transforms with
+    vtkTransformFilter, a view up of 0,-1,0 will result in the body part
+    facing the viewer.
+    NOTE: some transformations have a -1 scale factor for one of the components.
+          To ensure proper polygon orientation and normal direction, you must
+          apply the vtkPolyDataNormals filter.
+
+    Naming (the nomenclature is medical):
+    si - superior to inferior (top to bottom)
+    is - inferior to superior (bottom to top)
+    ap - anterior to posterior (front to back)
+    pa - posterior to anterior (back to front)
+    lr - left to right
+    rl - right to left
+
+    The transforms are built once per code by mediczna.orientation, which also
+    applies them to numpy volumes. They are shared, do not modify them.
+    """
+
+    @staticmethod
+    def s_i():
+        return orientation.get('si').vtk_transform()
+
+    @staticmethod
+    def i_s():
+        return orientation.get('is').vtk_transform()
+
+    @staticmethod
+    def a_p():
+        return orientation.get('ap').vtk_transform()
+
+    @staticmethod
+    def p_a():
+        return orientation.get('pa').vtk_transform()
+
+    @staticmethod
+    def l_r():
+        return orientation.get('lr').vtk_transform()
+
+    @staticmethod
+    def r_l():
+        return orientation.get('rl').vtk_transform()
+
+    @staticmethod
+    def h_f():
+        return orientation.get('hf').vtk_transform()
+
+    @staticmethod
+    def hf_si():
+        return orientation.get('hfsi').vtk_transform()
+
+    @staticmethod
+    def hf_is():
+        return orientation.get('hfis').vtk_transform()
+
+    @staticmethod
+    def hf_ap():
+        return orientation.get('hfap').vtk_transform()
+
+    @staticmethod
+    def hf_pa():
+        return orientation.get('hfpa').vtk_transform()
+
+    @staticmethod
+    def hf_lr():
+        return orientation.get('hflr').vtk_transform()
+
+    @staticmethod
+    def hf_rl():
+        return orientation.get('hfrl').vtk_transform()
+
+    @staticmethod
+    def get(order):
+        """
+        Returns the vtkTransform corresponding to the slice order.
+
+        :param order: The slice order
+        :return: The vtkTransform to use
+        """
+        if order not in orientation.ORDERS:
+            s = 'No such transform "{:s}" exists.'.format(order)
+            raise Exception(s)
+        return orientation.get(order).vtk_transform()
@@ -0,0 +1,250 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from pathlib import Path
+
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkCommonExecutionModel import vtkStreamingDemandDrivenPipeline
+from vtkmodules.vtkIOImage import (
+    vtkImageReader2,
+    vtkMetaImageReader
+)
+from vtkmodules.vtkImagingCore import vtkExtractVOI
+
+# Slider events arriving within this time are merged into one render
+DEBOUNCE_MS = 15
+
+
+def read_fields(file_name):
+    """
+    Read the key = value fields of a .mhd header.
+
+    :return: The fields as strings and the offset right after ElementDataFile.
+    """
+    fields = {}
+    header_end = 0
+    with open(file_name, 'rb') as f:
+        for line in f:
+            key, sep, value = line.decode('ascii', errors='replace').partition('=')
+            if sep:
+                fields[key.strip()] = value.strip()
+            if key.strip() == 'ElementDataFile':
+                header_end = f.tell()
+                break
+    return fields, header_end
+
+
+def streaming_reader(file_name):
+    """
+    Create a reader for a .mhd/.raw pair that reads only the requested extent.
+
+    vtkMetaImageReader always reads the whole volume, so the header is parsed
+    by it and the raw data is read by a vtkImageReader2 that seeks to the
+    slices actually requested downstream. Compressed data falls back to the
+    vtkMetaImageReader itself.
+
+    :param file_name: The .mhd file.
+    :return: A reader with up to date information.
+    """
+    meta_reader = vtkMetaImageReader()
+    meta_reader.SetFileName(str(file_name))
+    meta_reader.UpdateInformation()
+
+    fields, header_end = read_fields(file_name)
+    data_file = fields.get('ElementDataFile', '')
+    header_size = int(fields.get('HeaderSize', 0))
+    if fields.get('CompressedData', 'False').lower() == 'true' or header_size == -1 \
+            or data_file == 'LIST' or '%' in data_file:
+        return meta_reader
+
+    reader = vtkImageReader2()
+    if data_file == 'LOCAL':
+        reader.SetFileName(str(file_name))
+        reader.SetHeaderSize(header_end)
+    else:
+        reader.SetFileName(str(Path(file_name).parent.joinpath(data_file)))
+        reader.SetHeaderSize(header_size)
+    reader.SetFileDimensionality(3)
+    reader.FileLowerLeftOn()
+    reader.SetDataScalarType(meta_reader.GetDataScalarType())
+    reader.SetNumberOfScalarComponents(meta_reader.GetNumberOfScalarComponents())
+    msb = fields.get('ElementByteOrderMSB', fields.get('BinaryDataByteOrderMSB', 'False'))
+    if msb.lower() == 'true':
+        reader.SetDataByteOrderToBigEndian()
+    else:
+        reader.SetDataByteOrderToLittleEndian()
+    reader.SetDataExtent(meta_reader.GetDataExtent())
+    reader.SetDataSpacing(meta_reader.GetDataSpacing())
+    reader.SetDataOrigin(meta_reader.GetDataOrigin())
+    reader.UpdateInformation()
+    return reader
+
+
+class SliceStream:
+    """
+    Serves single slices of a streaming reader through a small block cache.
+
+    Slices are cut along axis, 0, 1 or 2 for x, y or z, and numbered from 0,
+    from the end of the axis if reverse is set. A cache miss reads block_size
+    consecutive slices in one request, so stepping to the adjacent slices
+    afterwards only copies from memory.
+
+    Given a second reader of the same file, the blocks ahead of the scrub
+    direction are read on a background thread. VTK pipelines must not be
+    shared between threads, so the background reads go through that reader.
+    Prefetches that are no longer ahead are cancelled if they have not started.
+    """
+
+    def __init__(self, reader, block_size=8, cache_size=8, prefetch_reader=None, ahead=2, axis=2, reverse=False):
+        self.reader = reader
+        self.extent = reader.GetOutputInformation(0).Get(
+            vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT())
+        self.axis = axis
+        self.reverse = reverse
+        self.block_size = block_size
+        self.cache_size = cache_size
+        self.blocks = OrderedDict()
+        self.ahead = ahead
+        self.direction = 1
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._position = None
+
+        self.block_reader = vtkExtractVOI()
+        self.block_reader.SetInputConnection(reader.GetOutputPort())
+
+        self._executor = None
+        if prefetch_reader is not None:
+            self._prefetch_reader = vtkExtractVOI()
+            self._prefetch_reader.SetInputConnection(prefetch_reader.GetOutputPort())
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix='slice-prefetch')
+
+        self.slicer = vtkExtractVOI()
+        self.set_slice(0)
+
+    def GetOutputPort(self):
+        return self.slicer.GetOutputPort()
+
+    def dimensions(self):
+        x0, x1, y0, y1, z0, z1 = self.extent
+        return x1 - x0 + 1, y1 - y0 + 1, z1 - z0 + 1
+
+    def __len__(self):
+        return self.dimensions()[self.axis]
+
+    def set_slice(self, index):
+        """
+        Point the output at slice index, reading its block if it is not cached.
+        """
+        index = min(max(index, 0), len(self) - 1)
+        # Position along the axis in the file, blocks and prefetching follow it
+        position = len(self) - 1 - index if self.reverse else index
+        if self._position is not None and position != self._position:
+            self.direction = 1 if position > self._position else -1
+        self._position = position
+
+        number = position // self.block_size
+        self.slicer.SetInputData(self.block(number))
+        self.slicer.SetVOI(*self._voi(position, position))
+        if self._executor is not None:
+            self.prefetch([number + self.direction * step for step in range(1, self.ahead + 1)])
+
+    def block(self, number):
+        with self._lock:
+            if number in self.blocks:
+                self.blocks.move_to_end(number)
+                return self.blocks[number]
+            job = self._jobs.pop(number, None)
+
+        block = None
+        if job is not None:
+            try:
+                block = job.result()
+            except CancelledError:
+                pass
+        if block is None:
+            block = self._read(self.block_reader, number)
+        self._store(number, block)
+        return block
+
+    def prefetch(self, numbers):
+        """
+        Read the given blocks in the background, cancelling other pending reads.
+        """
+        count = -(-len(self) // self.block_size)
+        numbers = [number for number in numbers if 0 <= number < count]
+        with self._lock:
+            for stale in [number for number in self._jobs if number not in numbers]:
+                self._jobs.pop(stale).cancel()
+            for number in numbers:
+                if number not in self.blocks and number not in self._jobs:
+                    self._jobs[number] = self._executor.submit(self._prefetch, number)
+
+    def close(self):
+        """
+        Stop the background reads.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prefetch(self, number):
+        block = self._read(self._prefetch_reader, number)
+        with self._lock:
+            # Taken by block(), which stores it, or no longer wanted
+            if self._jobs.pop(number, None) is None:
+                return block
+        self._store(number, block)
+        return block
+
+    def _voi(self, first, last):
+        """
+        The whole extent with positions first to last along the axis.
+        """
+        extent = list(self.extent)
+        start = extent[2 * self.axis]
+        extent[2 * self.axis:2 * self.axis + 2] = start + first, start + last
+        return extent
+
+    def _read(self, voi, number):
+        first = number * self.block_size
+        voi.SetVOI(*self._voi(first, min(first + self.block_size, len(self)) - 1))
+        voi.Update()
+        block = vtkImageData()
+        block.DeepCopy(voi.GetOutput())
+        return block
+
+    def _store(self, number, block):
+        with self._lock:
+            self.blocks[number] = block
+            self.blocks.move_to_end(number)
+            if len(self.blocks) > self.cache_size:
+                self.blocks.popitem(last=False)
+
+
+class Debounced:
+    """
+    Merges rapid events of a VTK widget into one call with the latest value.
+
+    Calling it only records the value and arms a one-shot interactor timer, the
+    callback runs with the last recorded value once the timer fires. A slider
+    drag then renders the latest slice instead of one render per value passed.
+    """
+
+    def __init__(self, interactor, callback, interval_ms=DEBOUNCE_MS):
+        self.interactor = interactor
+        self.callback = callback
+        self.interval_ms = interval_ms
+        self.value = None
+        self.timer = None
+        interactor.AddObserver('TimerEvent', self._on_timer)
+
+    def __call__(self, value):
+        self.value = value
+        if self.timer is None:
+            self.timer = self.interactor.CreateOneShotTimer(self.interval_ms)
+
+    def _on_timer(self, caller, event):
+        if self.timer is None or caller.GetTimerEventId() != self.timer:
+            return
+        self.timer = None
+        self.callback(self.value)
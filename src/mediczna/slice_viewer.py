@@ -0,0 +1,249 @@
+import sys
+import time
+from contextlib import nullcontext
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.colors import Normalize
+
+from mediczna.chunked import preview
+from mediczna.diff import LazyDiff
+from mediczna.frame_profile import stage
+from mediczna.overlay import DiffOverlay, SliceCache
+
+# Frames per second we expect when scrubbing through three 512x512 panels,
+# main() measures 21-23 fps with the agg canvas and fails below this
+TARGET_FPS = 20
+
+# How long the displayed slice has to stay put before previews are replaced
+# by full resolution slices
+FILL_DELAY_MS = 50
+
+# Slider events arriving within this time are merged into one render of the
+# latest requested slice
+DEBOUNCE_MS = 15
+
+
+class SliceViewer:
+    """
+    Displays slices of one or more volumes on persistent image artists.
+
+    Every layer gets a single AxesImage created up front with a fixed norm, so
+    an empty first slice does not break the colour mapping of later ones. Moving
+    to another slice only swaps the image data and blits the animated artists
+    over a cached background instead of redrawing the whole figure.
+
+    With progressive set, layers whose volumes have previews (see
+    chunked.ChunkedVolume) show them first and are filled in at full
+    resolution once the slice has not changed for FILL_DELAY_MS. This needs a
+    GUI canvas, whose timers run the fill.
+
+    With debounce set, request() renders only the latest of the slices
+    requested within DEBOUNCE_MS, so dragging a slider does not queue a render
+    for every value it passes. This needs a GUI canvas as well.
+
+    Given a frame_profile.FrameProfile, every displayed frame is timed by
+    stage, add_readout() shows the latest timings on the figure.
+    """
+
+    def __init__(self, fig, progressive=False, debounce=False, profile=None):
+        self.fig = fig
+        self.layers = []
+        self.animated = []
+        self.index = 0
+        self.indices = []
+        self._background = None
+        self._draw_cid = fig.canvas.mpl_connect('draw_event', self._on_draw)
+        self._fill_timer = None
+        if progressive:
+            self._fill_timer = fig.canvas.new_timer(interval=FILL_DELAY_MS)
+            self._fill_timer.single_shot = True
+            self._fill_timer.add_callback(self.fill)
+        self.profile = profile
+        self._readout = None
+        self._requested = None
+        self._show_timer = None
+        if debounce:
+            self._show_timer = fig.canvas.new_timer(interval=DEBOUNCE_MS)
+            self._show_timer.single_shot = True
+            self._show_timer.add_callback(self._show_requested)
+
+    def add_layer(self, ax, volume, cmap, vmin=None, vmax=None, alpha=None, interpolation=None):
+        """
+        Add an image layer showing slices of a volume on the given axes.
+
+        :param ax: The axes to draw on.
+        :param volume: Array indexed by slice along its first axis.
+        :param cmap: The colormap to use.
+        :param vmin: Lower bound of the norm, estimated from sampled slices if omitted.
+        :param vmax: Upper bound of the norm, estimated from sampled slices if omitted.
+        :param alpha: Opacity of the layer.
+        :param interpolation: Passed to imshow, 'nearest' suits label images.
+        :return: The created AxesImage.
+        """
+        if vmin is None or vmax is None:
+            low, high = sample_range(volume)
+            vmin = low if vmin is None else vmin
+            vmax = high if vmax is None else vmax
+        norm = Normalize(vmin=vmin, vmax=vmax if vmax > vmin else vmin + 1)
+        image = ax.imshow(volume[self.index], cmap=cmap, norm=norm, alpha=alpha,
+                          interpolation=interpolation, animated=True)
+        self.layers.append((image, volume))
+        self.indices.append(self.index)
+        return image
+
+    def add_animated(self, artist):
+        """
+        Redraw an additional artist (e.g. a slider axes) on every blit.
+        """
+        artist.set_animated(True)
+        self.animated.append(artist)
+
+    def show(self, index):
+        """
+        Display the slice with the given index on all layers.
+        """
+        self.index = index
+        self.show_indices([index] * len(self.layers))
+
+    def add_readout(self, x=0.01, y=0.01):
+        """
+        Show the frame rate and the stage timings of the previous frame at figure coordinates x, y.
+        """
+        if self.profile is None:
+            raise ValueError('The viewer has no profile to show')
+        self._readout = self.fig.text(x, y, '', fontsize='small', family='monospace')
+        self.add_animated(self._readout)
+
+    def request(self, index):
+        """
+        Display slice index soon, merging rapid requests into one render.
+        """
+        pending = self._requested is not None
+        self._requested = index
+        if self._show_timer is None:
+            self._show_requested()
+        elif not pending:
+            self._show_timer.start()
+
+    def _show_requested(self):
+        index, self._requested = self._requested, None
+        if index is not None:
+            self.show(index)
+
+    def show_indices(self, indices):
+        """
+        Display a different slice on every layer, e.g. orthogonal planes.
+        """
+        self.indices = list(indices)
+        with self._frame():
+            if self._fill_timer is not None:
+                with stage('fetch'):
+                    previews = [preview(volume, index) for (_, volume), index in zip(self.layers, self.indices)]
+                if any(data is not None for data in previews):
+                    for (image, volume), index, data in zip(self.layers, self.indices, previews):
+                        with stage('fetch'):
+                            data = volume[index] if data is None else data
+                        image.set_data(data)
+                    self.blit()
+                    # Restarted on every slice, so scrubbing only decodes previews
+                    self._fill_timer.stop()
+                    self._fill_timer.start()
+                    return
+            self.fill()
+
+    def fill(self):
+        """
+        Display the current slices at full resolution on all layers.
+        """
+        with self._frame():
+            for (image, volume), index in zip(self.layers, self.indices):
+                with stage('fetch'):
+                    data = volume[index]
+                image.set_data(data)
+            self.blit()
+
+    def blit(self):
+        canvas = self.fig.canvas
+        if self._readout is not None:
+            self._readout.set_text(self.profile.readout())
+        with stage('draw'):
+            if self._background is None:
+                canvas.draw_idle()
+                return
+            canvas.restore_region(self._background)
+            self._draw_animated()
+            canvas.blit(self.fig.bbox)
+            canvas.flush_events()
+
+    def _frame(self):
+        return nullcontext() if self.profile is None else self.profile.frame()
+
+    def _on_draw(self, event):
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for image, _ in self.layers:
+            self.fig.draw_artist(image)
+        # The images are drawn over the axes frames of the background
+        for ax in {image.axes for image, _ in self.layers}:
+            for spine in ax.spines.values():
+                self.fig.draw_artist(spine)
+        for artist in self.animated:
+            self.fig.draw_artist(artist)
+
+
+def sample_range(volume, n_slices=8):
+    """
+    Estimate the value range of a volume from a few evenly spaced slices.
+
+    Unlike volume.min()/volume.max() this does not read a memory-mapped volume
+    from disk in full.
+
+    :param volume: Array indexed by slice along its first axis.
+    :param n_slices: How many slices to look at.
+    :return: The (min, max) of the sampled slices.
+    """
+    step = max(1, len(volume) // n_slices)
+    sample = np.stack([volume[index] for index in range(0, len(volume), step)])
+    return sample.min(), sample.max()
+
+
+def measure_fps(viewer, indices):
+    """
+    Measure how many slices per second the viewer displays.
+
+    :param viewer: A SliceViewer whose figure has been drawn at least once.
+    :param indices: The slice indices to step through.
+    :return: Frames per second.
+    """
+    start = time.perf_counter()
+    for index in indices:
+        viewer.show(index)
+    return len(indices) / (time.perf_counter() - start)
+
+
+def main():
+    # Benchmark three 512x512 panels with a headless canvas
+    plt.switch_backend('agg')
+    rng = np.random.default_rng(0)
+    volume = rng.integers(-1000, 2000, size=(64, 512, 512), dtype=np.int16)
+    truth = (rng.random((64, 512, 512)) > 0.9).astype(np.uint8)
+    computed = (rng.random((64, 512, 512)) > 0.9).astype(np.uint8)
+
+    fig, axs = plt.subplots(1, 3)
+    viewer = SliceViewer(fig)
+    viewer.add_layer(axs[0], truth, 'Blues', vmin=0, interpolation='nearest')
+    viewer.add_layer(axs[1], SliceCache(DiffOverlay(volume, LazyDiff(truth, computed), -1000, 2000)), None, vmin=0, vmax=255)
+    viewer.add_layer(axs[2], computed, 'Reds', vmin=0, interpolation='nearest')
+    fig.canvas.draw()
+
+    fps = measure_fps(viewer, list(range(volume.shape[0])) * 2)
+    print('{:.1f} fps (target {:d} fps)'.format(fps, TARGET_FPS))
+    if fps < TARGET_FPS:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
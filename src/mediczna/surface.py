@@ -1,38 +1,42 @@
 #!/usr/bin/env python
 
-# noinspection PyUnresolvedReferences
-import vtkmodules.vtkInteractionStyle
-# noinspection PyUnresolvedReferences
-import vtkmodules.vtkRenderingOpenGL2
-from vtkmodules.vtkCommonColor import vtkNamedColors
-from vtkmodules.vtkCommonCore import (
-    VTK_VERSION_NUMBER,
-    vtkVersion
-)
-from vtkmodules.vtkFiltersCore import (
-    vtkFlyingEdges3D,
-    vtkMarchingCubes
-)
-from vtkmodules.vtkFiltersModeling import vtkOutlineFilter
-from vtkmodules.vtkIOImage import vtkMetaImageReader
-from vtkmodules.vtkRenderingCore import (
-    vtkActor,
-    vtkCamera,
-    vtkPolyDataMapper,
-    vtkProperty,
-    vtkRenderWindow,
-    vtkRenderWindowInteractor,
-    vtkRenderer
-)
+import argparse
+
+# Named colours of labels 1, 2, ... repeating
+LABEL_COLORS = ['Tomato', 'Banana', 'Mint', 'Peacock', 'Orchid', 'Tan']
+
+
+def run(args):
+    # noinspection PyUnresolvedReferences
+    import vtkmodules.vtkInteractionStyle
+    # noinspection PyUnresolvedReferences
+    import vtkmodules.vtkRenderingOpenGL2
+    from vtkmodules.vtkCommonColor import vtkNamedColors
+    from vtkmodules.vtkFiltersCore import (
+        vtkFlyingEdges3D,
+        vtkMarchingCubes
+    )
+    from vtkmodules.vtkFiltersSources import vtkOutlineSource
+    from vtkmodules.vtkIOImage import vtkMetaImageReader
+    from vtkmodules.vtkRenderingCore import (
+        vtkActor,
+        vtkCamera,
+        vtkPolyDataMapper,
+        vtkProperty,
+        vtkRenderWindow,
+        vtkRenderWindowInteractor,
+        vtkRenderer
+    )
+
+    from mediczna.surfaces import DEFAULT_CACHE_DIR, InteractiveLOD, isosurface, label_surfaces, lod_actor
 
-
-def main():
     # vtkFlyingEdges3D was introduced in VTK >= 8.2
     use_flying_edges = vtk_version_ok(8, 2, 0)
 
     colors = vtkNamedColors()
 
-    file_name = get_program_parameters()
+    file_name = args.filename
+    cache_dir = args.cache_dir or DEFAULT_CACHE_DIR
 
     colors.SetColor('SkinColor', [240, 184, 160, 255])
     colors.SetColor('BackfaceColor', [255, 229, 200, 255])
@@ -51,6 +55,7 @@ def main():
 
     reader = vtkMetaImageReader()
     reader.SetFileName(file_name)
+    reader.UpdateInformation()
 
     # An isosurface, or contour value of 500 is known to correspond to the
     # skin of the patient.
@@ -61,25 +66,31 @@ def main():
             skin_extractor = vtkMarchingCubes()
     else:
         skin_extractor = vtkMarchingCubes()
-    skin_extractor.SetInputConnection(reader.GetOutputPort())
     skin_extractor.SetValue(0, 500)
 
-    skin_mapper = vtkPolyDataMapper()
-    skin_mapper.SetInputConnection(skin_extractor.GetOutputPort())
-    skin_mapper.ScalarVisibilityOff()
+    # The surface and its decimated levels of detail are built on the first
+    # launch and read back from the mesh cache afterwards. While the camera
+    # moves the coarser levels are rendered to keep up with args.fps.
+    skin_levels = isosurface(file_name, skin_extractor, cache_dir)
 
-    skin = vtkActor()
-    skin.SetMapper(skin_mapper)
-    skin.GetProperty().SetDiffuseColor(colors.GetColor3d('SkinColor'))
+    skin_prop = vtkProperty()
+    skin_prop.SetDiffuseColor(colors.GetColor3d('SkinColor'))
 
     back_prop = vtkProperty()
     back_prop.SetDiffuseColor(colors.GetColor3d('BackfaceColor'))
-    skin.SetBackfaceProperty(back_prop)
 
-    # An outline provides context around the data.
+    skin = lod_actor(skin_levels, skin_prop, back_prop)
+
+    # An outline provides context around the data. It only needs the header,
+    # so a cached launch does not read the volume at all.
     #
-    outline_data = vtkOutlineFilter()
-    outline_data.SetInputConnection(reader.GetOutputPort())
+    x0, x1, y0, y1, z0, z1 = reader.GetDataExtent()
+    spacing = reader.GetDataSpacing()
+    origin = reader.GetDataOrigin()
+    outline_data = vtkOutlineSource()
+    outline_data.SetBounds(origin[0] + x0 * spacing[0], origin[0] + x1 * spacing[0],
+                           origin[1] + y0 * spacing[1], origin[1] + y1 * spacing[1],
+                           origin[2] + z0 * spacing[2], origin[2] + z1 * spacing[2])
 
     map_outline = vtkPolyDataMapper()
     map_outline.SetInputConnection(outline_data.GetOutputPort())
@@ -100,11 +111,22 @@ def main():
     a_camera.Azimuth(30.0)
     a_camera.Elevation(30.0)
 
+    # Label surfaces of a segmentation, contoured on the first launch and read
+    # back from the mesh cache afterwards.
+    label_actors = []
+    if args.labels:
+        for label, levels in sorted(label_surfaces(args.labels, cache_dir).items()):
+            label_prop = vtkProperty()
+            label_prop.SetDiffuseColor(colors.GetColor3d(LABEL_COLORS[(label - 1) % len(LABEL_COLORS)]))
+            label_actors.append(lod_actor(levels, label_prop))
+
     # Actors are added to the renderer. An initial camera view is created.
     # The Dolly() method moves the camera towards the FocalPoint,
     # thereby enlarging the image.
     a_renderer.AddActor(outline)
     a_renderer.AddActor(skin)
+    for label_actor in label_actors:
+        a_renderer.AddActor(label_actor)
     a_renderer.SetActiveCamera(a_camera)
     a_renderer.ResetCamera()
     a_camera.Dolly(1.5)
@@ -123,13 +145,16 @@ def main():
     # between the planes is actually rendered.
     a_renderer.ResetCameraClippingRange()
 
+    # Frame rate to keep while interacting, the levels of detail are picked to
+    # fit it. The observers it adds to the render window keep it alive.
+    InteractiveLOD(iren, [skin] + label_actors, args.fps)
+
     # Initialize the event loop and then start it.
     iren.Initialize()
     iren.Start()
 
 
-def get_program_parameters():
-    import argparse
+def get_program_parameters(argv=None):
     description = 'The skin extracted from a CT dataset of the head.'
     epilogue = '''
     Derived from VTK/Examples/Cxx/Medical1.cxx
@@ -138,9 +163,16 @@ def get_program_parameters():
     '''
     parser = argparse.ArgumentParser(description=description, epilog=epilogue,
                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def add_arguments(parser):
     parser.add_argument('filename', help='FullHead.mhd.')
-    args = parser.parse_args()
-    return args.filename
+    parser.add_argument('--labels', help='A segmentation .mhd whose label surfaces are shown too')
+    parser.add_argument('--cache-dir', help='Where surfaces are cached, ~/.cache/mediczna/surfaces by default')
+    parser.add_argument('--fps', type=float, default=15, help='Target frame rate while the camera moves')
 
 
 def vtk_version_ok(major, minor, build):
@@ -152,10 +184,12 @@ def vtk_version_ok(major, minor, build):
     :param build: Build version.
     :return: True if the requested VTK version is greater or equal to the actual VTK version.
     """
+    from vtkmodules.vtkCommonCore import vtkVersion
+
     needed_version = 10000000000 * int(major) + 100000000 * int(minor) + int(build)
     try:
-        vtk_version_number = VTK_VERSION_NUMBER
-    except AttributeError:  # as error:
+        from vtkmodules.vtkCommonCore import VTK_VERSION_NUMBER as vtk_version_number
+    except ImportError:
         ver = vtkVersion()
         vtk_version_number = 10000000000 * ver.GetVTKMajorVersion() + 100000000 * ver.GetVTKMinorVersion() \
                              + ver.GetVTKBuildVersion()
@@ -165,4 +199,9 @@ def vtk_version_ok(major, minor, build):
         return False
 
 
-main()
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+import argparse
+import sys
+
+
+def run(args):
+    import numpy as np
+    # noinspection PyUnresolvedReferences
+    import vtkmodules.vtkInteractionStyle
+    # noinspection PyUnresolvedReferences
+    import vtkmodules.vtkRenderingOpenGL2
+    from vtkmodules.util.numpy_support import vtk_to_numpy
+    from vtkmodules.vtkCommonColor import vtkNamedColors
+    from vtkmodules.vtkRenderingAnnotation import vtkScalarBarActor
+    from vtkmodules.vtkRenderingCore import (
+        vtkColorTransferFunction,
+        vtkProperty,
+        vtkRenderWindow,
+        vtkRenderWindowInteractor,
+        vtkRenderer
+    )
+
+    from mediczna.surfaces import (
+        DEFAULT_CACHE_DIR,
+        InteractiveLOD,
+        isosurface,
+        lod_actor,
+        mask_extractor,
+        probe,
+        signed_distance_image
+    )
+
+    colors = vtkNamedColors()
+    colors.SetColor('BkgColor', [51, 77, 102, 255])
+    cache_dir = args.cache_dir or DEFAULT_CACHE_DIR
+
+    # Signed distance to the truth surface at every voxel, computed once. Each
+    # vertex of the computed surface then only interpolates it.
+    try:
+        distance = signed_distance_image(args.truth, args.computed)
+    except ValueError as e:
+        print('Cannot measure the surface distance: {}'.format(e), file=sys.stderr)
+        sys.exit(1)
+
+    # The surfaces of both segmentations: everything labelled is inside. They
+    # are contoured on the first launch and read back from the mesh cache
+    # afterwards, with their levels of detail.
+    computed_levels = isosurface(args.computed, mask_extractor(), cache_dir)
+    truth_levels = isosurface(args.truth, mask_extractor(), cache_dir)
+    computed_levels = [probe(polydata, distance) for polydata in computed_levels]
+
+    values = vtk_to_numpy(computed_levels[0].GetPointData().GetScalars())
+    if len(values):
+        print('Vertex distance to the truth surface: mean {:.2f}, mean absolute {:.2f}, max absolute {:.2f}'.format(
+            values.mean(), np.abs(values).mean(), np.abs(values).max()))
+    distance_range = args.range if args.range else max(float(np.abs(values).max(initial=0)), 1.0)
+
+    # Blue where the computed surface lies inside the truth, red where it lies
+    # outside, white where both agree
+    lut = vtkColorTransferFunction()
+    lut.SetColorSpaceToDiverging()
+    lut.AddRGBPoint(-distance_range, *colors.GetColor3d('Blue'))
+    lut.AddRGBPoint(0.0, *colors.GetColor3d('White'))
+    lut.AddRGBPoint(distance_range, *colors.GetColor3d('Red'))
+
+    computed = lod_actor(computed_levels, vtkProperty(), lut=lut)
+
+    truth_prop = vtkProperty()
+    truth_prop.SetColor(colors.GetColor3d('Gainsboro'))
+    truth_prop.SetOpacity(args.truth_opacity)
+    truth = lod_actor(truth_levels, truth_prop)
+    truth.SetVisibility(args.truth_opacity > 0)
+
+    scalar_bar = vtkScalarBarActor()
+    scalar_bar.SetLookupTable(lut)
+    scalar_bar.SetTitle('Signed distance')
+    scalar_bar.SetNumberOfLabels(5)
+
+    renderer = vtkRenderer()
+    renderer.AddActor(computed)
+    renderer.AddActor(truth)
+    renderer.AddActor(scalar_bar)
+    renderer.SetBackground(colors.GetColor3d('BkgColor'))
+    renderer.ResetCamera()
+
+    ren_win = vtkRenderWindow()
+    ren_win.AddRenderer(renderer)
+    ren_win.SetSize(800, 800)
+    ren_win.SetWindowName('SurfaceDistance')
+
+    iren = vtkRenderWindowInteractor()
+    iren.SetRenderWindow(ren_win)
+
+    # Kept alive by the observers it adds to the render window
+    InteractiveLOD(iren, [computed, truth], args.fps)
+
+    iren.Initialize()
+    iren.Start()
+
+
+def get_program_parameters(argv=None):
+    description = 'The computed segmentation surface coloured by its signed distance to the ground truth surface.'
+    epilogue = '''
+    Distances are negative where the computed surface lies inside the ground
+    truth (under-segmentation) and positive where it lies outside of it
+    (over-segmentation), in the units of the element spacing.
+    '''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def add_arguments(parser):
+    parser.add_argument('truth', help='The ground truth segmentation, e.g. segmentation_14.mhd')
+    parser.add_argument('computed', help='The computed segmentation, same geometry as truth')
+    parser.add_argument('--range', type=float, help='Distance mapped to full red/blue, the largest distance by default')
+    parser.add_argument('--truth-opacity', type=float, default=0.2, help='Opacity of the truth surface, 0 hides it')
+    parser.add_argument('--cache-dir', help='Where surfaces are cached, ~/.cache/mediczna/surfaces by default')
+    parser.add_argument('--fps', type=float, default=15, help='Target frame rate while the camera moves')
+
+
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.ndimage import distance_transform_edt, find_objects
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonCore import vtkSMPTools
+from vtkmodules.vtkCommonDataModel import vtkImageData
+from vtkmodules.vtkFiltersCore import (
+    vtkFlyingEdges3D,
+    vtkPolyDataNormals,
+    vtkProbeFilter,
+    vtkQuadricDecimation
+)
+from vtkmodules.vtkFiltersGeneral import vtkDiscreteFlyingEdges3D
+from vtkmodules.vtkIOImage import vtkMetaImageReader
+from vtkmodules.vtkIOXML import (
+    vtkXMLPolyDataReader,
+    vtkXMLPolyDataWriter
+)
+from vtkmodules.vtkImagingCore import vtkExtractVOI
+from vtkmodules.vtkRenderingCore import (
+    vtkLODProp3D,
+    vtkPolyDataMapper
+)
+
+from mediczna.slice_stream import read_fields
+
+DEFAULT_CACHE_DIR = Path.home().joinpath('.cache', 'mediczna', 'surfaces')
+
+# Fraction of triangles removed by each coarser level of detail
+LOD_REDUCTIONS = (0.75, 0.95)
+
+
+def file_hash(file_name, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Hash the contents of a .mhd file and of the data file it references.
+
+    Hashing a large volume takes a while, so the digest is remembered by file
+    size and modification time and only recomputed when the files change.
+
+    :param file_name: The .mhd file.
+    :param cache_dir: Where the remembered digests are kept.
+    :return: A hex digest.
+    """
+    file_name = Path(file_name).resolve()
+    files = [file_name]
+    data_file = read_fields(file_name)[0].get('ElementDataFile', 'LOCAL')
+    if data_file != 'LOCAL':
+        files.append(file_name.parent.joinpath(data_file))
+    stamp = [[str(f), f.stat().st_size, f.stat().st_mtime_ns] for f in files]
+
+    known_path = Path(cache_dir).joinpath('hashes.json')
+    known = json.loads(known_path.read_text()) if known_path.is_file() else {}
+    entry = known.get(str(file_name))
+    if entry and entry['stamp'] == stamp:
+        return entry['hash']
+
+    digest = hashlib.blake2b(digest_size=16)
+    for f in files:
+        with open(f, 'rb') as stream:
+            for block in iter(lambda: stream.read(1 << 20), b''):
+                digest.update(block)
+
+    known[str(file_name)] = {'stamp': stamp, 'hash': digest.hexdigest()}
+    known_path.parent.mkdir(parents=True, exist_ok=True)
+    known_path.write_text(json.dumps(known))
+    return digest.hexdigest()
+
+
+def extract_label_surfaces(reader, threads=None):
+    """
+    Contour every label of a segmentation with discrete flying edges.
+
+    Each label is contoured only inside its bounding box (grown by one voxel
+    so the surface closes), using all cores through vtkSMPTools.
+
+    :param reader: A reader or algorithm producing the label image.
+    :param threads: Number of threads, all cores if None.
+    :return: A dict mapping label values to vtkPolyData.
+    """
+    vtkSMPTools.Initialize(threads or os.cpu_count())
+
+    reader.Update()
+    image = reader.GetOutput()
+    x_dim, y_dim, z_dim = image.GetDimensions()
+    x0, _, y0, _, z0, _ = image.GetExtent()
+    labels = vtk_to_numpy(image.GetPointData().GetScalars()).reshape(z_dim, y_dim, x_dim)
+
+    surfaces = {}
+    for label, bbox in enumerate(find_objects(labels), 1):
+        if bbox is None:
+            continue
+        zs, ys, xs = bbox
+        voi = vtkExtractVOI()
+        voi.SetInputData(image)
+        voi.SetVOI(x0 + max(xs.start - 1, 0), x0 + min(xs.stop, x_dim - 1),
+                   y0 + max(ys.start - 1, 0), y0 + min(ys.stop, y_dim - 1),
+                   z0 + max(zs.start - 1, 0), z0 + min(zs.stop, z_dim - 1))
+
+        contour = vtkDiscreteFlyingEdges3D()
+        contour.SetInputConnection(voi.GetOutputPort())
+        contour.SetValue(0, label)
+        contour.ComputeNormalsOn()
+        contour.ComputeScalarsOff()
+        contour.Update()
+        surfaces[label] = contour.GetOutput()
+    return surfaces
+
+
+def build_lods(polydata, reductions=LOD_REDUCTIONS):
+    """
+    Decimate a surface into a level of detail pyramid.
+
+    :param polydata: The full resolution surface.
+    :param reductions: Fraction of triangles to remove for each coarser level.
+    :return: A list of vtkPolyData, full resolution first.
+    """
+    levels = [polydata]
+    for reduction in reductions:
+        decimate = vtkQuadricDecimation()
+        decimate.SetInputData(polydata)
+        decimate.SetTargetReduction(reduction)
+        decimate.VolumePreservationOn()
+
+        normals = vtkPolyDataNormals()
+        normals.SetInputConnection(decimate.GetOutputPort())
+        normals.SplittingOff()
+        normals.Update()
+        levels.append(normals.GetOutput())
+    return levels
+
+
+def lod_actor(levels, prop, backface_prop=None, lut=None):
+    """
+    A prop holding every level of detail of a surface.
+
+    :param levels: vtkPolyData levels, as returned by build_lods.
+    :param prop: The vtkProperty of the surface.
+    :param backface_prop: An optional vtkProperty for back faces.
+    :param lut: A lookup table colouring the point scalars over its range,
+                the scalars are ignored if None.
+    :return: A vtkLODProp3D showing the full resolution level, to be driven
+             by an InteractiveLOD.
+    """
+    actor = vtkLODProp3D()
+    actor.lod_ids = []
+    for polydata in levels:
+        mapper = vtkPolyDataMapper()
+        mapper.SetInputData(polydata)
+        if lut is None:
+            mapper.ScalarVisibilityOff()
+        else:
+            mapper.SetLookupTable(lut)
+            mapper.SetScalarRange(lut.GetRange())
+            mapper.SetScalarModeToUsePointData()
+        if backface_prop is None:
+            actor.lod_ids.append(actor.AddLOD(mapper, prop, 0.0))
+        else:
+            actor.lod_ids.append(actor.AddLOD(mapper, prop, backface_prop, None, 0.0))
+    actor.AutomaticLODSelectionOff()
+    actor.SetSelectedLODID(actor.lod_ids[0])
+    return actor
+
+
+class InteractiveLOD:
+    """
+    Renders coarser levels of detail while the camera moves.
+
+    vtkLODProp3D's automatic selection relies on mapper draw time estimates,
+    which do not include the time the (software) OpenGL implementation takes
+    to finish the frame. Instead, the wall clock time between interactive
+    frames is measured and the level is made coarser while it exceeds the
+    frame budget, and finer while it stays well below it. The full resolution
+    level is rendered again when the interaction ends.
+    """
+
+    def __init__(self, interactor, actors, fps=15.0):
+        self.interactor = interactor
+        self.actors = actors
+        self.budget = 1.0 / fps
+        self.levels = min(len(actor.lod_ids) for actor in actors) if actors else 1
+        self.level = min(1, self.levels - 1)
+        self.last_frame = None
+
+        interactor.SetDesiredUpdateRate(fps)
+        interactor.GetRenderWindow().AddObserver('StartEvent', self.frame_started)
+
+    def moving(self):
+        return self.interactor.GetRenderWindow().GetDesiredUpdateRate() > self.interactor.GetStillUpdateRate()
+
+    def frame_started(self, caller, ev):
+        now = time.perf_counter()
+        if not self.moving():
+            self.last_frame = None
+            self.select(0)
+            return
+
+        if self.last_frame is not None:
+            period = now - self.last_frame
+            if period > self.budget and self.level < self.levels - 1:
+                self.level += 1
+            elif period < self.budget / 2 and self.level > 0:
+                self.level -= 1
+        self.last_frame = now
+        self.select(self.level)
+
+    def select(self, level):
+        for actor in self.actors:
+            actor.SetSelectedLODID(actor.lod_ids[level])
+
+
+def write_mesh(polydata, file_name):
+    writer = vtkXMLPolyDataWriter()
+    writer.SetInputData(polydata)
+    writer.SetFileName(str(file_name))
+    writer.SetDataModeToAppended()
+    writer.EncodeAppendedDataOff()
+    writer.SetCompressorTypeToZLib()
+    writer.Write()
+
+
+def read_mesh(file_name):
+    reader = vtkXMLPolyDataReader()
+    reader.SetFileName(str(file_name))
+    reader.Update()
+    return reader.GetOutput()
+
+
+def read_index(mesh_dir):
+    index_path = Path(mesh_dir).joinpath('index.json')
+    return json.loads(index_path.read_text()) if index_path.is_file() else {}
+
+
+def write_levels(mesh_dir, name, levels):
+    mesh_dir.mkdir(parents=True, exist_ok=True)
+    for level, polydata in enumerate(levels):
+        write_mesh(polydata, mesh_dir.joinpath('{:s}_lod{:d}.vtp'.format(name, level)))
+
+
+def read_levels(mesh_dir, name, reductions):
+    return [read_mesh(mesh_dir.joinpath('{:s}_lod{:d}.vtp'.format(name, level)))
+            for level in range(len(reductions) + 1)]
+
+
+def update_index(mesh_dir, key, entry):
+    # Written after the meshes, a cache entry missing from it gets rebuilt
+    index = read_index(mesh_dir)
+    index[key] = entry
+    mesh_dir.joinpath('index.json').write_text(json.dumps(index))
+
+
+def isosurface(file_name, extractor, cache_dir=DEFAULT_CACHE_DIR, reductions=LOD_REDUCTIONS):
+    """
+    An isosurface of a volume with its levels of detail, contoured once and then cached.
+
+    :param file_name: The volume .mhd file.
+    :param extractor: A contour filter (e.g. vtkFlyingEdges3D) with its value set.
+    :param cache_dir: The cache directory.
+    :param reductions: Fraction of triangles to remove for each coarser level.
+    :return: A list of vtkPolyData, full resolution first.
+    """
+    mesh_dir = Path(cache_dir).joinpath(file_hash(file_name, cache_dir))
+    name = 'iso_{:g}'.format(extractor.GetValue(0))
+    if read_index(mesh_dir).get(name) == {'reductions': list(reductions)}:
+        return read_levels(mesh_dir, name, reductions)
+
+    reader = vtkMetaImageReader()
+    reader.SetFileName(str(file_name))
+    extractor.SetInputConnection(reader.GetOutputPort())
+    extractor.Update()
+
+    levels = build_lods(extractor.GetOutput(), reductions)
+    write_levels(mesh_dir, name, levels)
+    update_index(mesh_dir, name, {'reductions': list(reductions)})
+    return levels
+
+
+def label_surfaces(file_name, cache_dir=DEFAULT_CACHE_DIR, threads=None, reductions=LOD_REDUCTIONS):
+    """
+    The surface of every label of a segmentation with its levels of detail,
+    contoured once and then cached.
+
+    Meshes are stored as compressed .vtp files in a directory named after the
+    hash of the segmentation, so later launches only read them back.
+
+    :param file_name: The segmentation .mhd file.
+    :param cache_dir: The cache directory.
+    :param threads: Number of contouring threads, all cores if None.
+    :param reductions: Fraction of triangles to remove for each coarser level.
+    :return: A dict mapping label values to lists of vtkPolyData, full resolution first.
+    """
+    mesh_dir = Path(cache_dir).joinpath(file_hash(file_name, cache_dir))
+    entry = read_index(mesh_dir).get('labels')
+    if entry and entry['reductions'] == list(reductions):
+        return {label: read_levels(mesh_dir, 'label_{:d}'.format(label), reductions) for label in entry['labels']}
+
+    reader = vtkMetaImageReader()
+    reader.SetFileName(str(file_name))
+    surfaces = {label: build_lods(polydata, reductions)
+                for label, polydata in extract_label_surfaces(reader, threads).items()}
+
+    for label, levels in surfaces.items():
+        write_levels(mesh_dir, 'label_{:d}'.format(label), levels)
+    update_index(mesh_dir, 'labels', {'labels': sorted(surfaces), 'reductions': list(reductions)})
+    return surfaces
+
+
+def mask_extractor():
+    """
+    A contour filter splitting background from any label.
+    """
+    extractor = vtkFlyingEdges3D()
+    extractor.SetValue(0, 0.5)
+    extractor.ComputeNormalsOn()
+    extractor.ComputeScalarsOff()
+    return extractor
+
+
+def read_mask(file_name):
+    reader = vtkMetaImageReader()
+    reader.SetFileName(str(file_name))
+    reader.Update()
+    image = reader.GetOutput()
+    x_dim, y_dim, z_dim = image.GetDimensions()
+    mask = vtk_to_numpy(image.GetPointData().GetScalars()).reshape(z_dim, y_dim, x_dim) > 0
+    return mask, image
+
+
+def signed_distance_image(truth_file_name, computed_file_name):
+    """
+    The signed distance to the truth surface, negative inside the truth.
+
+    The distance transforms only cover the bounding box of both segmentations
+    grown by two voxels, which contains every point of the computed surface.
+
+    :param truth_file_name: The ground truth segmentation .mhd file.
+    :param computed_file_name: The computed segmentation .mhd file.
+    :return: A float32 vtkImageData with the same geometry as the segmentations
+             over the cropped region.
+    :raises ValueError: If the segmentations differ in size or either has no
+                        labelled voxels, and so no surface.
+    """
+    truth, image = read_mask(truth_file_name)
+    computed, _ = read_mask(computed_file_name)
+    if truth.shape != computed.shape:
+        raise ValueError('{:s} and {:s} have different dimensions'.format(
+            str(truth_file_name), str(computed_file_name)))
+    for mask, file_name in ((truth, truth_file_name), (computed, computed_file_name)):
+        if not mask.any():
+            raise ValueError('{:s} has no labelled voxels'.format(str(file_name)))
+
+    bbox = find_objects((truth | computed).view(np.uint8))
+    roi = tuple(slice(max(axis.start - 2, 0), min(axis.stop + 2, size))
+                for axis, size in zip(bbox[0], truth.shape))
+    truth = truth[roi]
+
+    # VTK spacing is (x, y, z), the arrays are indexed (z, y, x)
+    spacing = image.GetSpacing()
+    sampling = spacing[::-1]
+    # Voxel centres are half a voxel away from the surface contoured at 0.5,
+    # both transforms are shifted by that so the distance is 0 on the surface
+    half = min(sampling) / 2
+    distance = (distance_transform_edt(~truth, sampling=sampling) - half) * ~truth \
+        - (distance_transform_edt(truth, sampling=sampling) - half) * truth
+
+    x0, _, y0, _, z0, _ = image.GetExtent()
+    origin = image.GetOrigin()
+    distance_image = vtkImageData()
+    distance_image.SetDimensions(distance.shape[::-1])
+    distance_image.SetSpacing(spacing)
+    distance_image.SetOrigin([o + (e + axis.start) * s for o, e, axis, s in
+                              zip(origin, (x0, y0, z0), roi[::-1], spacing)])
+    scalars = numpy_to_vtk(np.ascontiguousarray(distance, dtype=np.float32).ravel(), deep=True)
+    scalars.SetName('distance')
+    distance_image.GetPointData().SetScalars(scalars)
+    return distance_image
+
+
+def probe(polydata, image):
+    """
+    Interpolate the image at the points of a surface.
+
+    :return: A copy of the surface with the image values as point scalars.
+    """
+    probe_filter = vtkProbeFilter()
+    probe_filter.SetInputData(polydata)
+    probe_filter.SetSourceData(image)
+    probe_filter.PassPointArraysOn()
+    probe_filter.Update()
+    output = probe_filter.GetOutput()
+    output.GetPointData().SetActiveScalars('distance')
+    return output
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+import argparse
+
+from mediczna.surface import LABEL_COLORS
+
+# CT transfer functions in HU: (opacity points, colour points)
+PRESETS = {
+    'soft': ([(-300, 0.0), (40, 0.08), (80, 0.15), (400, 0.3), (1500, 0.6)],
+             [(-1000, (0.0, 0.0, 0.0)), (40, (0.8, 0.45, 0.35)), (400, (1.0, 0.9, 0.8)), (1500, (1.0, 1.0, 1.0))]),
+    'bone': ([(150, 0.0), (300, 0.3), (1500, 0.8)],
+             [(150, (0.9, 0.8, 0.6)), (1500, (1.0, 1.0, 1.0))]),
+}
+
+# Ray step while the camera moves, in multiples of the still one
+INTERACTIVE_STEP = 4
+
+# Largest image sample distance (pixels per ray) the mapper may use to keep up
+MAX_IMAGE_SAMPLE_DISTANCE = 8
+
+
+def get_program_parameters(argv=None):
+    description = 'Direct volume rendering of a CT volume and its labels on the CPU.'
+    epilogue = '''
+    The volume is ray cast by vtkFixedPointVolumeRayCastMapper on all CPU
+    cores. While the camera moves the rays step further and fewer of them are
+    cast, as coarse as needed for the target frame rate. Once the camera stops
+    the view is rendered again at full quality.
+    '''
+    parser = argparse.ArgumentParser(description=description, epilog=epilogue,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def add_arguments(parser):
+    parser.add_argument('filename', help='The volume, a .mhd file or a .chunked folder')
+    parser.add_argument('--labels', help='A segmentation blended in with a colour per label')
+    parser.add_argument('--preset', choices=PRESETS, default='soft', help='CT transfer function')
+    parser.add_argument('--label-opacity', type=float, default=0.3, help='Opacity of the labelled voxels')
+    parser.add_argument('--fps', type=float, default=10, help='Target frame rate while the camera moves')
+    parser.add_argument('--threads', type=int, help='Ray casting threads, all CPUs by default')
+    parser.add_argument('--shrink', type=int, default=1, help='Render every n-th voxel along each axis')
+    parser.add_argument('--shade', action='store_true', help='Shade the CT by its gradient (slower)')
+
+
+def volume_image(volume_file, labels_file=None, step=1):
+    """
+    The volume, and the labels as a second component, as vtkImageData.
+
+    The files are opened with chunked.open_volume, so .mhd files are memory
+    mapped and .chunked folders are decompressed, and only every step-th voxel
+    is read into the image.
+
+    :return: The image and the largest label (0 without labels).
+    """
+    import numpy as np
+    from vtkmodules.util.numpy_support import numpy_to_vtk
+    from vtkmodules.vtkCommonDataModel import vtkImageData
+
+    from mediczna.chunked import open_volume
+
+    volume, header = open_volume(volume_file)
+    subsample = (slice(None, None, step),) * 3
+    components = [np.asarray(volume[subsample])]
+    max_label = 0
+    if labels_file is not None:
+        labels, _ = open_volume(labels_file)
+        labels = np.asarray(labels[subsample])
+        max_label = int(labels.max())
+        # The mapper needs one scalar type for all components
+        components.append(labels.astype(components[0].dtype))
+    data = np.stack(components, axis=-1)
+
+    image = vtkImageData()
+    image.SetDimensions(data.shape[2], data.shape[1], data.shape[0])
+    image.SetSpacing(*[spacing * step for spacing in header['ElementSpacing']])
+    image.SetOrigin(*header.get('Offset', (0.0, 0.0, 0.0)))
+    # numpy_to_vtk keeps a reference to data, the voxels are not copied again
+    image.GetPointData().SetScalars(numpy_to_vtk(data.reshape(-1, data.shape[-1]), deep=False))
+    return image, max_label
+
+
+def volume_property(preset='soft', max_label=0, label_opacity=0.3, shade=False):
+    """
+    Transfer functions of the CT component and, if max_label > 0, of the label component.
+
+    The interpolation type applies to all components, and trilinear sampling
+    would blend label values at boundaries (between labels 1 and 3 into 2),
+    so volumes with labels are sampled at the nearest voxel.
+    """
+    from vtkmodules.vtkCommonColor import vtkNamedColors
+    from vtkmodules.vtkCommonDataModel import vtkPiecewiseFunction
+    from vtkmodules.vtkRenderingCore import vtkColorTransferFunction, vtkVolumeProperty
+
+    prop = vtkVolumeProperty()
+    prop.IndependentComponentsOn()
+    if max_label > 0:
+        prop.SetInterpolationTypeToNearest()
+    else:
+        prop.SetInterpolationTypeToLinear()
+
+    opacity_points, color_points = PRESETS[preset]
+    opacity = vtkPiecewiseFunction()
+    for value, alpha in opacity_points:
+        opacity.AddPoint(value, alpha)
+    color = vtkColorTransferFunction()
+    for value, rgb in color_points:
+        color.AddRGBPoint(value, *rgb)
+    prop.SetScalarOpacity(0, opacity)
+    prop.SetColor(0, color)
+    prop.SetShade(0, shade)
+
+    if max_label > 0:
+        colors = vtkNamedColors()
+        label_opacity_function = vtkPiecewiseFunction()
+        label_opacity_function.AddPoint(0, 0.0)
+        label_opacity_function.AddPoint(0.5, 0.0)
+        label_opacity_function.AddPoint(0.51, label_opacity)
+        label_opacity_function.AddPoint(max_label, label_opacity)
+        label_color = vtkColorTransferFunction()
+        label_color.AddRGBPoint(0, 0.0, 0.0, 0.0)
+        for label in range(1, max_label + 1):
+            label_color.AddRGBPoint(label, *colors.GetColor3d(LABEL_COLORS[(label - 1) % len(LABEL_COLORS)]))
+        prop.SetScalarOpacity(1, label_opacity_function)
+        prop.SetColor(1, label_color)
+        prop.SetShade(1, False)
+    return prop
+
+
+def create_volume_view(volume_file, labels_file=None, step=1, preset='soft', label_opacity=0.3, shade=False,
+                       threads=None):
+    """
+    Build the render window of the volume rendering, not rendered yet so it can be made offscreen first.
+
+    The mapper adjusts its sample distances to the time allocated to each
+    render: set a desired update rate on the interactor or the render window.
+
+    :return: The vtkRenderWindow and the vtkFixedPointVolumeRayCastMapper.
+    """
+    # noinspection PyUnresolvedReferences
+    import vtkmodules.vtkRenderingOpenGL2
+    # noinspection PyUnresolvedReferences
+    import vtkmodules.vtkRenderingVolumeOpenGL2
+    from vtkmodules.vtkCommonColor import vtkNamedColors
+    from vtkmodules.vtkRenderingCore import vtkRenderWindow, vtkRenderer, vtkVolume
+    from vtkmodules.vtkRenderingVolume import vtkFixedPointVolumeRayCastMapper
+
+    image, max_label = volume_image(volume_file, labels_file, step)
+
+    mapper = vtkFixedPointVolumeRayCastMapper()
+    mapper.SetInputData(image)
+    if threads:
+        mapper.SetNumberOfThreads(threads)
+    # Rays step one voxel when still and INTERACTIVE_STEP voxels while moving,
+    # and cast for every n-th pixel as needed to keep up
+    voxel = min(image.GetSpacing())
+    mapper.SetSampleDistance(voxel)
+    mapper.SetInteractiveSampleDistance(INTERACTIVE_STEP * voxel)
+    mapper.AutoAdjustSampleDistancesOn()
+    mapper.SetMinimumImageSampleDistance(1)
+    mapper.SetMaximumImageSampleDistance(MAX_IMAGE_SAMPLE_DISTANCE)
+
+    volume = vtkVolume()
+    volume.SetMapper(mapper)
+    volume.SetProperty(volume_property(preset, max_label, label_opacity, shade))
+
+    renderer = vtkRenderer()
+    renderer.AddVolume(volume)
+    renderer.SetBackground(vtkNamedColors().GetColor3d('SlateGray'))
+    camera = renderer.GetActiveCamera()
+    camera.SetViewUp(0, 0, -1)
+    camera.SetPosition(0, -1, 0)
+    camera.SetFocalPoint(0, 0, 0)
+    camera.Azimuth(30.0)
+    camera.Elevation(30.0)
+    renderer.ResetCamera()
+
+    ren_win = vtkRenderWindow()
+    ren_win.AddRenderer(renderer)
+    ren_win.SetSize(800, 800)
+    ren_win.SetWindowName('Volume')
+    return ren_win, mapper
+
+
+def run(args):
+    # noinspection PyUnresolvedReferences
+    import vtkmodules.vtkInteractionStyle
+    from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
+    from vtkmodules.vtkRenderingCore import vtkRenderWindowInteractor
+
+    ren_win, mapper = create_volume_view(args.filename, args.labels, args.shrink, args.preset,
+                                         args.label_opacity, args.shade, args.threads)
+
+    iren = vtkRenderWindowInteractor()
+    iren.SetRenderWindow(ren_win)
+    iren.SetInteractorStyle(vtkInteractorStyleTrackballCamera())
+    # The interactor asks for this rate while the camera moves and for the
+    # still rate afterwards, which gives the mapper all the time it needs
+    iren.SetDesiredUpdateRate(args.fps)
+    iren.SetStillUpdateRate(0.0001)
+
+    iren.Initialize()
+    ren_win.Render()
+    iren.Start()
+
+
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+
+import argparse
+from pathlib import Path
+
+from mediczna.plt_vis import add_orientation_argument, add_profile_arguments
+
+
+def get_program_parameters(argv=None):
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    return args
+
+
+def add_arguments(parser):
+    parser.add_argument('data_folder', help='The path to segmentation and volume mhd/raw files')
+    parser.add_argument('volume_filename', help='e.g. volume_14')
+    parser.add_argument('segmentation_filename', help='e.g segmentation_14')
+    parser.add_argument('slice_number', help='e.g 1')
+    add_orientation_argument(parser, default='hfsi')
+    add_profile_arguments(parser)
+
+
+def run(args):
+    # noinspection PyUnresolvedReferences
+    import vtkmodules.vtkInteractionStyle
+    from vtkmodules.vtkInteractionWidgets import (
+        vtkSliderRepresentation2D,
+        vtkSliderWidget
+    )
+    from vtkmodules.vtkRenderingCore import vtkRenderWindowInteractor, vtkTextActor
+
+    from mediczna.frame_profile import FrameProfile, stage
+    from mediczna.slice_stream import Debounced
+
+    data_folder = args.data_folder
+    volume_filename = args.volume_filename
+    segmentation_filename = args.segmentation_filename
+    slice_number = int(args.slice_number)
+
+    # Read the data
+    path = Path(data_folder)
+    if path.is_dir():
+        s = ''
+        fn_1 = path.joinpath(volume_filename).with_suffix('.mhd')
+        if not fn_1.is_file():
+            s += 'The file: {:s} does not exist.\n'.format(str(fn_1))
+            print(s)
+        fn_2 = path.joinpath(segmentation_filename).with_suffix('.mhd')
+        if not fn_2.is_file():
+            s += 'The file: {:s} does not exist.'.format(str(fn_2))
+        if s:
+            print(s)
+            return
+    else:
+        print('Expected a path to dir containing .mhd volumes and segmentations')
+        return
+
+    ren_win, (grey_slicer, segment_slicer) = create_slice_view(fn_1, fn_2, slice_number, args.orientation)
+
+    iren = vtkRenderWindowInteractor()
+    iren.SetRenderWindow(ren_win)
+
+    readout = None
+    if args.readout:
+        readout = vtkTextActor()
+        readout.SetDisplayPosition(10, 10)
+        ren_win.GetRenderers().GetFirstRenderer().AddActor2D(readout)
+    ren_win.Render()
+
+    # --- slider to change frame: callback class, sliderRepresentation, slider
+    class FrameCallback(object):
+        def __init__(self, renWin):
+            self.renWin = renWin
+            self.profile = FrameProfile()
+
+        def __call__(self, value):
+            with self.profile.frame():
+                # The texture colour mapping happens during the render
+                with stage('fetch'):
+                    segment_slicer.set_slice(value)
+                    grey_slicer.set_slice(value)
+                if readout is not None:
+                    readout.SetInput(self.profile.readout())
+                with stage('draw'):
+                    self.renWin.Render()
+
+    sliderRep = vtkSliderRepresentation2D()
+    sliderRep.GetPoint1Coordinate().SetCoordinateSystemToNormalizedDisplay()
+    sliderRep.GetPoint1Coordinate().SetValue(.7, .1)
+    sliderRep.GetPoint2Coordinate().SetCoordinateSystemToNormalizedDisplay()
+    sliderRep.GetPoint2Coordinate().SetValue(.9, .1)
+    sliderRep.SetMinimumValue(0)
+    sliderRep.SetMaximumValue(len(grey_slicer) - 1)
+    sliderRep.SetValue(slice_number)
+    sliderRep.SetTitleText("frame")
+
+    slider = vtkSliderWidget()
+    slider.SetInteractor(iren)
+    slider.SetRepresentation(sliderRep)
+    slider.SetAnimationModeToAnimate()
+    slider.EnabledOn()
+    # A drag renders only the latest slider value once the interactor is idle
+    frame_callback = FrameCallback(ren_win)
+    show_frame = Debounced(iren, frame_callback)
+    slider.AddObserver('InteractionEvent',
+                       lambda caller, ev: show_frame(int(caller.GetSliderRepresentation().GetValue())))
+
+    iren.Start()
+    grey_slicer.close()
+    segment_slicer.close()
+
+    if frame_callback.profile.count:
+        print(frame_callback.profile.report())
+    if args.profile:
+        frame_callback.profile.dump(args.profile, viewer='slices', data_folder=str(path),
+                                    files=[fn_1.name, fn_2.name])
+
+
+def create_slice_view(volume_file, segmentation_file, slice_number, order='hfsi'):
+    """
+    Build the render window showing a volume slice, its segmentation and both overlaid.
+
+    The window is not rendered yet, so it can be made offscreen first.
+
+    Slices are cut along the first axis of the volume reoriented by order and
+    numbered like the slices of the matplotlib viewers with --orientation.
+    The slice planes are placed in the volume and moved by the VTK transform
+    of the orientation, which faces them to the camera with the anatomy the
+    matplotlib viewers show.
+
+    :param volume_file: The volume .mhd file.
+    :param segmentation_file: The segmentation .mhd file.
+    :param slice_number: The slice shown initially.
+    :param order: The slice order code, see orientation.ORDERS.
+    :return: The vtkRenderWindow and the SliceStreams of the volume and the
+             segmentation, set_slice() on both followed by a render shows another slice.
+    """
+    # noinspection PyUnresolvedReferences
+    import vtkmodules.vtkRenderingOpenGL2
+    from vtkmodules.vtkCommonColor import vtkNamedColors
+    from vtkmodules.vtkFiltersCore import vtkPolyDataNormals
+    from vtkmodules.vtkFiltersGeneral import vtkTransformPolyDataFilter
+    from vtkmodules.vtkRenderingCore import (
+        vtkActor,
+        vtkCamera,
+        vtkPolyDataMapper,
+        vtkRenderWindow,
+        vtkRenderer,
+        vtkTexture,
+        vtkWindowLevelLookupTable,
+    )
+
+    from mediczna import orientation
+    from mediczna.slice_stream import SliceStream, streaming_reader
+
+    colors = vtkNamedColors()
+    orient = orientation.get(order)
+    # The axis of the files the reoriented slices are cut along, in VTK (x, y, z) order
+    axis = 2 - orient.axes[0]
+
+    # Now create the RenderWindow and Renderers
+    ren1 = vtkRenderer()
+    ren2 = vtkRenderer()
+    ren3 = vtkRenderer()
+    ren_win = vtkRenderWindow()
+    ren_win.AddRenderer(ren1)
+    ren_win.AddRenderer(ren2)
+    ren_win.AddRenderer(ren3)
+    ren_win.SetWindowName('TestSeg')
+
+    # Only the header is read here. The extent of the displayed slice is read
+    # from disk on demand and the texture gets the real slice size instead of
+    # a padded 1024x1024 copy. A second reader prefetches the slices ahead.
+    grey_slicer = SliceStream(streaming_reader(volume_file), prefetch_reader=streaming_reader(volume_file),
+                              axis=axis, reverse=orient.flips[0])
+    grey_slicer.set_slice(slice_number)
+
+    grey_plane = slice_plane(grey_slicer)
+
+    grey_transform = vtkTransformPolyDataFilter()
+    grey_transform.SetTransform(orient.vtk_transform())
+    grey_transform.SetInputConnection(grey_plane.GetOutputPort())
+
+    grey_normals = vtkPolyDataNormals()
+    grey_normals.SetInputConnection(grey_transform.GetOutputPort())
+    grey_normals.FlipNormalsOff()
+
+    wllut = vtkWindowLevelLookupTable()
+    wllut.SetWindow(255)
+    wllut.SetLevel(128)
+    wllut.SetTableRange(0, 255)
+    wllut.Build()
+
+    grey_mapper = vtkPolyDataMapper()
+    grey_mapper.SetInputConnection(grey_normals.GetOutputPort())
+
+    grey_texture = vtkTexture()
+    grey_texture.SetInputConnection(grey_slicer.GetOutputPort())
+    grey_texture.SetLookupTable(wllut)
+    grey_texture.SetColorModeToMapScalars()
+    grey_texture.InterpolateOn()
+
+    grey_actor = vtkActor()
+    grey_actor.SetMapper(grey_mapper)
+    grey_actor.SetTexture(grey_texture)
+
+    segment_slicer = SliceStream(streaming_reader(segmentation_file),
+                                 prefetch_reader=streaming_reader(segmentation_file),
+                                 axis=axis, reverse=orient.flips[0])
+    segment_slicer.set_slice(slice_number)
+
+    segment_plane = slice_plane(segment_slicer)
+
+    segment_transform = vtkTransformPolyDataFilter()
+    segment_transform.SetTransform(orient.vtk_transform())
+    segment_transform.SetInputConnection(segment_plane.GetOutputPort())
+
+    segment_normals = vtkPolyDataNormals()
+    segment_normals.SetInputConnection(segment_transform.GetOutputPort())
+    segment_normals.FlipNormalsOn()
+
+    lut = create_lut(colors)
+
+    segment_mapper = vtkPolyDataMapper()
+    segment_mapper.SetInputConnection(segment_normals.GetOutputPort())
+
+    segment_texture = vtkTexture()
+    segment_texture.SetInputConnection(segment_slicer.GetOutputPort())
+    segment_texture.SetLookupTable(lut)
+    segment_texture.SetColorModeToMapScalars()
+    segment_texture.InterpolateOff()
+
+    segment_actor = vtkActor()
+    segment_actor.SetMapper(segment_mapper)
+    segment_actor.SetTexture(segment_texture)
+
+    segment_overlay_actor = vtkActor()
+    segment_overlay_actor.SetMapper(segment_mapper)
+    segment_overlay_actor.SetTexture(segment_texture)
+
+    segment_overlay_actor.GetProperty().SetOpacity(.5)
+    ren1.SetBackground(0, 0, 0)
+    ren1.SetViewport(0, 0.5, 0.5, 1)
+    ren_win.SetSize(900, 900)
+    ren1.AddActor(grey_actor)
+
+    ren2.SetBackground(0, 0, 0)
+    ren2.SetViewport(0.5, 0.5, 1, 1)
+    ren2.AddActor(segment_actor)
+
+    # The transformed planes face -z, a view up of 0,-1,0 shows them like the
+    # matplotlib viewers
+    cam1 = vtkCamera()
+    cam1.SetViewUp(0, -1, 0)
+    cam1.SetPosition(0, 0, -1)
+    cam1.SetFocalPoint(0, 0, 0)
+    ren1.SetActiveCamera(cam1)
+    ren1.ResetCamera()
+
+    ren3.AddActor(grey_actor)
+    ren3.AddActor(segment_overlay_actor)
+    # In front of the volume slice, in mm
+    segment_overlay_actor.SetPosition(0, 0, -1)
+
+    ren1.SetBackground(colors.GetColor3d('SlateGray'))
+    ren2.SetBackground(colors.GetColor3d('SlateGray'))
+    ren3.SetBackground(colors.GetColor3d('SlateGray'))
+
+    ren3.SetViewport(0, 0, 1, 0.5)
+
+    ren2.SetActiveCamera(ren1.GetActiveCamera())
+    ren3.SetActiveCamera(ren1.GetActiveCamera())
+
+    return ren_win, (grey_slicer, segment_slicer)
+
+
+def slice_plane(stream):
+    """
+    A plane covering the slices of a SliceStream, centred on the origin.
+
+    The plane spans the two other axes of the volume in mm, in (x, y, z) order,
+    so the texture of a slice lies as the slice does in the volume.
+    """
+    from vtkmodules.vtkFiltersSources import vtkPlaneSource
+
+    spacing = stream.reader.GetDataSpacing()
+    # The texture runs along the first remaining axis, then the second
+    first, second = [axis for axis in range(3) if axis != stream.axis]
+    size = [dimension * step for dimension, step in zip(stream.dimensions(), spacing)]
+    origin = [0.0, 0.0, 0.0]
+    origin[first], origin[second] = -size[first] / 2, -size[second] / 2
+    point1, point2 = list(origin), list(origin)
+    point1[first] += size[first]
+    point2[second] += size[second]
+
+    plane = vtkPlaneSource()
+    plane.SetOrigin(origin)
+    plane.SetPoint1(point1)
+    plane.SetPoint2(point2)
+    return plane
+
+
+def create_lut(colors):
+    from vtkmodules.vtkCommonCore import vtkLookupTable
+
+    lut = vtkLookupTable()
+    lut.SetNumberOfColors(2)
+    lut.SetTableRange(0, 2)
+    lut.Build()
+
+    lut.SetTableValue(0, colors.GetColor4d('Black'))
+    lut.SetTableValue(1, colors.GetColor4d('salmon'))
+
+    return lut
+
+
+def main():
+    run(get_program_parameters())
+
+
+if __name__ == '__main__':
+    main()
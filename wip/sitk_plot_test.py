@@ -3,8 +3,9 @@ import matplotlib.pylab as plt
 
 # https://stackoverflow.com/questions/37290631/reading-mhd-raw-format-in-python
 # (512, 512, 439)
-ct_scans = sitk.GetArrayFromImage(sitk.ReadImage("data/volume_14.mhd", sitk.sitkFloat32))
-# ct_scans = sitk.GetArrayFromImage(sitk.ReadImage("data/segmentation_14.mhd", sitk.sitkFloat32))
+# Read in the pixel type of the file (int16 CT), imshow scales it like float32
+ct_scans = sitk.GetArrayFromImage(sitk.ReadImage("data/volume_14.mhd"))
+# ct_scans = sitk.GetArrayFromImage(sitk.ReadImage("data/segmentation_14.mhd"))
 # subset
 ct_scans = ct_scans[:513][:513][150:180]
 
@@ -1,173 +0,0 @@
-from vtkmodules.vtkCommonMath import vtkMatrix4x4
-from vtkmodules.vtkCommonTransforms import vtkTransform
-
-
-class SliceOrder:
-    """
-    These transformations permute image and other geometric data to maintain proper
-     orientation regardless of the acquisition order. After applying these transforms with
-    vtkTransformFilter, a view up of 0,-1,0 will result in the body part
-    facing the viewer.
-    NOTE: some transformations have a -1 scale factor for one of the components.
-          To ensure proper polygon orientation and normal direction, you must
-          apply the vtkPolyDataNormals filter.
-
-    Naming (the nomenclature is medical):
-    si - superior to inferior (top to bottom)
-    is - inferior to superior (bottom to top)
-    ap - anterior to posterior (front to back)
-    pa - posterior to anterior (back to front)
-    lr - left to right
-    rl - right to left
-    """
-
-    def __init__(self):
-        self.si_mat = vtkMatrix4x4()
-        self.si_mat.Zero()
-        self.si_mat.SetElement(0, 0, 1)
-        self.si_mat.SetElement(1, 2, 1)
-        self.si_mat.SetElement(2, 1, -1)
-        self.si_mat.SetElement(3, 3, 1)
-
-        self.is_mat = vtkMatrix4x4()
-        self.is_mat.Zero()
-        self.is_mat.SetElement(0, 0, 1)
-        self.is_mat.SetElement(1, 2, -1)
-        self.is_mat.SetElement(2, 1, -1)
-        self.is_mat.SetElement(3, 3, 1)
-
-        self.lr_mat = vtkMatrix4x4()
-        self.lr_mat.Zero()
-        self.lr_mat.SetElement(0, 2, -1)
-        self.lr_mat.SetElement(1, 1, -1)
-        self.lr_mat.SetElement(2, 0, 1)
-        self.lr_mat.SetElement(3, 3, 1)
-
-        self.rl_mat = vtkMatrix4x4()
-        self.rl_mat.Zero()
-        self.rl_mat.SetElement(0, 2, 1)
-        self.rl_mat.SetElement(1, 1, -1)
-        self.rl_mat.SetElement(2, 0, 1)
-        self.rl_mat.SetElement(3, 3, 1)
-
-        """
-        The previous transforms assume radiological views of the slices (viewed from the feet). other
-        modalities such as physical sectioning may view from the head. These transforms modify the original
-        with a 180° rotation about y
-        """
-
-        self.hf_mat = vtkMatrix4x4()
-        self.hf_mat.Zero()
-        self.hf_mat.SetElement(0, 0, -1)
-        self.hf_mat.SetElement(1, 1, 1)
-        self.hf_mat.SetElement(2, 2, -1)
-        self.hf_mat.SetElement(3, 3, 1)
-
-    def s_i(self):
-        t = vtkTransform()
-        t.SetMatrix(self.si_mat)
-        return t
-
-    def i_s(self):
-        t = vtkTransform()
-        t.SetMatrix(self.is_mat)
-        return t
-
-    @staticmethod
-    def a_p():
-        t = vtkTransform()
-        return t.Scale(1, -1, 1)
-
-    @staticmethod
-    def p_a():
-        t = vtkTransform()
-        return t.Scale(1, -1, -1)
-
-    def l_r(self):
-        t = vtkTransform()
-        t.SetMatrix(self.lr_mat)
-        t.Update()
-        return t
-
-    def r_l(self):
-        t = vtkTransform()
-        t.SetMatrix(self.lr_mat)
-        return t
-
-    def h_f(self):
-        t = vtkTransform()
-        t.SetMatrix(self.hf_mat)
-        return t
-
-    def hf_si(self):
-        t = vtkTransform()
-        t.Concatenate(self.hf_mat)
-        t.Concatenate(self.si_mat)
-        return t
-
-    def hf_is(self):
-        t = vtkTransform()
-        t.Concatenate(self.hf_mat)
-        t.Concatenate(self.is_mat)
-        return t
-
-    def hf_ap(self):
-        t = vtkTransform()
-        t.Concatenate(self.hf_mat)
-        t.Scale(1, -1, 1)
-        return t
-
-    def hf_pa(self):
-        t = vtkTransform()
-        t.Concatenate(self.hf_mat)
-        t.Scale(1, -1, -1)
-        return t
-
-    def hf_lr(self):
-        t = vtkTransform()
-        t.Concatenate(self.hf_mat)
-        t.Concatenate(self.lr_mat)
-        return t
-
-    def hf_rl(self):
-        t = vtkTransform()
-        t.Concatenate(self.hf_mat)
-        t.Concatenate(self.rl_mat)
-        return t
-
-    def get(self, order):
-        """
-        Returns the vtkTransform corresponding to the slice order.
-
-        :param order: The slice order
-        :return: The vtkTransform to use
-        """
-        if order == 'si':
-            return self.s_i()
-        elif order == 'is':
-            return self.i_s()
-        elif order == 'ap':
-            return self.a_p()
-        elif order == 'pa':
-            return self.p_a()
-        elif order == 'lr':
-            return self.l_r()
-        elif order == 'rl':
-            return self.r_l()
-        elif order == 'hf':
-            return self.h_f()
-        elif order == 'hfsi':
-            return self.hf_si()
-        elif order == 'hfis':
-            return self.hf_is()
-        elif order == 'hfap':
-            return self.hf_ap()
-        elif order == 'hfpa':
-            return self.hf_pa()
-        elif order == 'hflr':
-            return self.hf_lr()
-        elif order == 'hfrl':
-            return self.hf_rl()
-        else:
-            s = 'No such transform "{:s}" exists.'.format(order)
-            raise Exception(s)
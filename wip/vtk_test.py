@@ -1,42 +1,65 @@
+import argparse
+
 import vtk
 
+from mediczna.frame_profile import FrameProfile, stage
+from mediczna.plt_vis import add_profile_arguments
+from mediczna.slice_stream import Debounced, SliceStream, streaming_reader
+
+parser = argparse.ArgumentParser()
+add_profile_arguments(parser)
+args = parser.parse_args()
+
 # --- source: read data
 dir = './data'
 seg_filename = f"{dir}/segmentation_14.mhd"
 vol_filename = f"{dir}/volume_14.mhd"
 
-reader = vtk.vtkMetaImageReader()
-reader.SetFileName(vol_filename)
-reader.Update()
-imageData = reader.GetOutput()
-
-# print(imageData.GetScalarRange())
-# print(imageData.GetDimensions())
-# print(imageData)
+# only the header is read here, slices are streamed from disk when displayed
+# and the ones ahead are read in the background by a second reader
+stream = SliceStream(streaming_reader(vol_filename), prefetch_reader=streaming_reader(vol_filename))
+stream.set_slice(1)
 
-print(imageData.GetDimensions())
-dims = imageData.GetDimensions()
+print(stream.dimensions())
+dims = stream.dimensions()
 nFrames = dims[2]
 winWidth = 750
 winCenter = 100
 
-# --- filter: apply winWidth and winCenter
-shiftScaleFilter = vtk.vtkImageShiftScale()
-shiftScaleFilter.SetOutputScalarTypeToUnsignedChar()  # output type
-shiftScaleFilter.SetInputConnection(reader.GetOutputPort())  # input connection
-shiftScaleFilter.SetShift(-winCenter + 0.5 * winWidth)
-shiftScaleFilter.SetScale(255 / winWidth)
-shiftScaleFilter.SetClampOverflow(True)
+# window/level presets (width, center) selected with the number keys
+presets = {
+    '0': ('default', winWidth, winCenter),
+    '1': ('soft tissue', 400, 40),
+    '2': ('lung', 1500, -600),
+    '3': ('bone', 1800, 400),
+    '4': ('liver', 150, 30),
+}
 
 # --- actor: imageActor (displays 2D images)
+# winWidth and winCenter are applied by the image property's lookup table when
+# the displayed slice is drawn, changing them does not touch the volume
 actor = vtk.vtkImageActor()
-actor.SetDisplayExtent(0, dims[0] - 1, 0, dims[1] - 1, 0,
-                       nFrames - 1)  # set region to display (xStart, xEnd, yStart, yEnd, zStart, zEnd)
-actor.GetMapper().SetInputConnection(shiftScaleFilter.GetOutputPort())  # input connection
+actor.SetDisplayExtent(0, dims[0] - 1, 0, dims[1] - 1, 1, 1)  # set region to display (xStart, xEnd, yStart, yEnd, zStart, zEnd)
+actor.GetMapper().SetInputConnection(stream.GetOutputPort())  # input connection
+actor.GetProperty().SetColorWindow(winWidth)
+actor.GetProperty().SetColorLevel(winCenter)
+actor.GetProperty().SetInterpolationTypeToLinear()
+
+# --- text: current window/level
+windowLevelText = vtk.vtkTextActor()
+windowLevelText.SetDisplayPosition(10, 10)
 
 # --- renderer
 ren1 = vtk.vtkRenderer()
 ren1.AddActor(actor)
+ren1.AddActor(windowLevelText)
+
+# --- text: frame rate and stage timings, above the window/level
+readout = None
+if args.readout:
+    readout = vtk.vtkTextActor()
+    readout.SetDisplayPosition(10, 30)
+    ren1.AddActor(readout)
 
 # --- window
 renWin = vtk.vtkRenderWindow()
@@ -53,11 +76,17 @@ class FrameCallback(object):
     def __init__(self, actor, renWin):
         self.renWin = renWin
         self.actor = actor
+        self.profile = FrameProfile()
 
-    def __call__(self, caller, ev):
-        value = caller.GetSliderRepresentation().GetValue()
-        actor.SetDisplayExtent(0, dims[0] - 1, 0, dims[1] - 1, int(value), int(value))
-        self.renWin.Render()
+    def __call__(self, value):
+        with self.profile.frame():
+            with stage('fetch'):
+                stream.set_slice(value)
+            actor.SetDisplayExtent(0, dims[0] - 1, 0, dims[1] - 1, value, value)
+            if readout is not None:
+                readout.SetInput(self.profile.readout())
+            with stage('draw'):
+                self.renWin.Render()
 
 
 sliderRep = vtk.vtkSliderRepresentation2D()
@@ -75,10 +104,49 @@ slider.SetInteractor(iren)
 slider.SetRepresentation(sliderRep)
 slider.SetAnimationModeToAnimate()
 slider.EnabledOn()
-slider.AddObserver('InteractionEvent', FrameCallback(actor, renWin))
+# slider drags render only the latest value once the interactor is idle
+frame_callback = FrameCallback(actor, renWin)
+show_frame = Debounced(iren, frame_callback)
+slider.AddObserver('InteractionEvent', lambda caller, ev: show_frame(int(caller.GetSliderRepresentation().GetValue())))
+
+
+# --- window/level: left mouse drag or number key presets
+def show_window_level(name=None):
+    text = 'W {:.0f} L {:.0f}'.format(actor.GetProperty().GetColorWindow(), actor.GetProperty().GetColorLevel())
+    if name:
+        text += ' ({:s})'.format(name)
+    windowLevelText.SetInput(text)
+
+
+def window_level_changed(caller, ev):
+    show_window_level()
+
+
+def key_pressed(caller, ev):
+    key = iren.GetKeyCode()
+    if key not in presets:
+        # keep the default key bindings of the style
+        caller.OnChar()
+        return
+    name, width, center = presets[key]
+    actor.GetProperty().SetColorWindow(width)
+    actor.GetProperty().SetColorLevel(center)
+    show_window_level(name)
+    renWin.Render()
+
+
+show_window_level(presets['0'][0])
 
 # --- run
-style = vtk.vtkInteractorStyleTrackballCamera()
+style = vtk.vtkInteractorStyleImage()
+# observing WindowLevelEvent would replace the style's own window/level handling
+style.AddObserver('InteractionEvent', window_level_changed)
+style.AddObserver('CharEvent', key_pressed)
 iren.SetInteractorStyle(style)
 iren.Initialize()
 iren.Start()
+stream.close()
+if frame_callback.profile.count:
+    print(frame_callback.profile.report())
+if args.profile:
+    frame_callback.profile.dump(args.profile, viewer='vtk_test', files=[vol_filename])